@@ -0,0 +1,119 @@
+"""
+Single-pass aggregation of the interaction table for the dashboards.
+
+black4.py used to run one pandas pipeline per section over the same
+interactions: nunique/mean for the KPIs, a groupby per user for the
+behaviour and activity tables, another for the favourite genres, and
+so on, each building its own intermediate frames.
+
+aggregate_interactions() factorizes the users and maps every
+interaction to its catalog row once, then fills every section from
+those two integer keys with np.bincount:
+
+    user code x 1            -> watches per user
+    user code x rating/time  -> rating and watch-time sums per user
+    movie row x 1            -> views per movie (Movies Watched KPI)
+    user code x genre        -> views per user and genre; its column
+                                sums are the genre popularity and its
+                                row maxima the favourite genres
+
+The results come back as a DashboardMetrics object whose frames have
+the same columns the dashboard sections showed before.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class DashboardMetrics:
+    """Everything the dashboard sections show about one interaction table."""
+
+    users: pd.Index                 # UserIDs in order of first appearance
+    num_users: int
+    movies_watched: int             # distinct movies with a view
+    avg_rating: float
+    avg_watch_time: float
+    genre_popularity: pd.DataFrame  # Genre, TotalViews (most viewed first)
+    user_behaviour: pd.DataFrame    # UserID, MoviesWatched, AvgRating,
+                                    # AvgWatchTime, FavoriteGenre
+    user_activity: pd.DataFrame     # UserID, MoviesWatched (all views)
+    user_genre_views: pd.DataFrame  # UserID x genre view counts
+
+    def favorite_genre(self, user):
+        """Most watched genre of one user (ties: first by name)."""
+        return self.user_genre_views.loc[user].idxmax()
+
+
+def aggregate_interactions(interactions, movies, genre_index):
+    """
+    DashboardMetrics of an interaction table (UserID, MovieID,
+    UserRating, WatchTime) on `movies`, a head() of the catalog that
+    `genre_index` was built from.
+    """
+    # Shared keys: a sorted user code and a catalog row per interaction
+    codes, users = pd.factorize(interactions["UserID"])
+    by_user = users.argsort(kind="stable")
+    rank = np.empty(len(users), dtype=np.int64)
+    rank[by_user] = np.arange(len(users))
+    codes = rank[codes]
+    sorted_users = pd.Index(users[by_user], name="UserID")
+
+    rows = pd.Index(movies["MovieID"]).get_indexer(interactions["MovieID"])
+    ratings = interactions["UserRating"].to_numpy(dtype=np.float64)
+    minutes = interactions["WatchTime"].to_numpy(dtype=np.float64)
+
+    num_users = len(users)
+    watches = np.bincount(codes, minlength=num_users)
+    rating_sums = np.bincount(codes, weights=ratings, minlength=num_users)
+    minute_sums = np.bincount(codes, weights=minutes, minlength=num_users)
+    movie_views = np.bincount(rows, minlength=len(movies))
+
+    # Distinct movies per user: sort the (user, movie) pair codes and
+    # count each pair at its first occurrence
+    pairs = np.sort(codes * len(movies) + rows)
+    first = np.ones(len(pairs), dtype=bool)
+    first[1:] = pairs[1:] != pairs[:-1]
+    distinct = np.bincount(pairs[first] // len(movies), minlength=num_users)
+
+    genre_counts = genre_index.grouped_genre_views(rows, codes, num_users)
+    user_genre_views = pd.DataFrame(
+        genre_counts, index=sorted_users, columns=genre_index.genres
+    )
+    favorite = genre_index.genres[genre_counts.argmax(axis=1)]
+
+    genre_views = pd.Series(
+        genre_counts.sum(axis=0), index=genre_index.genres, name="TotalViews"
+    )
+    genre_popularity = (
+        genre_views[genre_views > 0]
+        .sort_values(ascending=False, kind="stable")
+        .reset_index()
+    )
+
+    user_behaviour = pd.DataFrame({
+        "UserID": sorted_users,
+        "MoviesWatched": distinct,
+        "AvgRating": rating_sums / watches,
+        "AvgWatchTime": minute_sums / watches,
+        "FavoriteGenre": favorite
+    })
+    user_activity = pd.DataFrame({
+        "UserID": sorted_users,
+        "MoviesWatched": watches
+    })
+
+    total = max(len(ratings), 1)
+    return DashboardMetrics(
+        users=users,
+        num_users=num_users,
+        movies_watched=int(np.count_nonzero(movie_views)),
+        avg_rating=float(ratings.sum() / total),
+        avg_watch_time=float(minutes.sum() / total),
+        genre_popularity=genre_popularity,
+        user_behaviour=user_behaviour,
+        user_activity=user_activity,
+        user_genre_views=user_genre_views
+    )
@@ -1,8 +1,13 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
 import os
 
+from catalog import load_catalog
+from event_log import (
+    attach_movies, ensure_log, first_per_user, load_events, log_path
+)
+from simulate import generate_interactions
+
 # -------------------------------------------------
 # PAGE CONFIG
 # -------------------------------------------------
@@ -25,15 +30,18 @@ st.markdown(
 # -------------------------------------------------
 FILE_NAME = "asta.csv"
 
+# Largest number of movies the sidebar slider can select
+MAX_MOVIES = 500
+
 if not os.path.exists(FILE_NAME):
     st.error("❌ asta.csv not found. Upload it to GitHub.")
     st.stop()
 
-movies = pd.read_csv(FILE_NAME, encoding="latin1")
-movies.columns = movies.columns.str.strip()
-
-required_cols = ["MovieID", "MovieName", "Genre", "BaseRating"]
-movies = movies[required_cols].dropna()
+# Frame and version of one catalog version, so the event log below is
+# always keyed on the version its movies come from
+catalog = load_catalog(FILE_NAME)
+movies = catalog.movies
+version = catalog.version
 
 st.success("✅ Movie dataset loaded successfully")
 
@@ -41,40 +49,46 @@ st.success("✅ Movie dataset loaded successfully")
 # SIDEBAR CONTROLS
 # -------------------------------------------------
 st.sidebar.header("🎛️ Controls")
-num_movies = st.sidebar.slider("Number of Movies to Analyze", 100, 500, 250)
+num_movies = st.sidebar.slider(
+    "Number of Movies to Analyze", 100, MAX_MOVIES, 250
+)
+log_movies = movies.head(MAX_MOVIES)
 movies = movies.head(num_movies)
 
 users = ["U01", "U02", "U03", "U04", "U05"]
-np.random.seed(10)
 
 # -------------------------------------------------
 # SYNTHETIC USER INTERACTIONS
 # -------------------------------------------------
-records = []
-dates = pd.date_range("2024-01-01", "2024-06-30")
-
-for user in users:
-    sample_movies = movies.sample(60, replace=False)
-    for _, row in sample_movies.iterrows():
-        records.append([
-            user,
-            row["MovieID"],
-            row["MovieName"],
-            row["Genre"],
-            round(np.random.normal(row["BaseRating"], 0.5), 1),
-            np.random.randint(60, 180),
-            np.random.choice(dates)
-        ])
-
-df = pd.DataFrame(
-    records,
-    columns=[
-        "UserID", "MovieID", "MovieName",
-        "Genre", "UserRating", "WatchTime", "WatchDate"
-    ]
+# 60 distinct movies per user, rating ~ Normal(BaseRating, 0.5) clipped
+# to 1-5, drawn for all users at once (seeded numpy Generator).
+# The log is generated once per catalog version and settings, not per
+# slider position, and kept on disk (partitioned by watch month): it
+# rates every one of the first MAX_MOVIES movies for every user and
+# gives each user their own random order of them. A rerun reads the
+# selected movies and keeps each user's first 60 in that order, which
+# is a uniform draw of 60 distinct movies from the selected ones
+def build_events():
+    events = generate_interactions(
+        log_movies, users, [np.arange(len(log_movies))],
+        sigma=0.5, seed=10, columns=()
+    )
+    rng = np.random.default_rng(10)
+    events["Order"] = np.concatenate(
+        [rng.permutation(len(log_movies)) for _ in users]
+    )
+    return events
+
+
+events_log = ensure_log(
+    log_path(FILE_NAME, "black", (version, MAX_MOVIES, users, "order",
+                                  0.5, 10)),
+    build_events
+)
+movie_ids = movies["MovieID"]
+df = attach_movies(
+    first_per_user(load_events(events_log, movies=movie_ids), 60), movies
 )
-
-df["UserRating"] = df["UserRating"].clip(1, 5)
 
 # -------------------------------------------------
 # DATA PREVIEW
@@ -147,8 +161,12 @@ st.dataframe(user_profile)
 # -------------------------------------------------
 st.subheader("📅 Viewing Trends Over Time")
 
-df["Month"] = df["WatchDate"].dt.to_period("M").astype(str)
-monthly_views = df.groupby("Month")["MovieName"].count()
+# Views per month of the shown interactions
+monthly_views = (
+    df.groupby(df["WatchDate"].dt.strftime("%Y-%m"))["MovieID"]
+    .count()
+    .rename_axis("Month")
+)
 
 st.line_chart(monthly_views)
 
@@ -159,7 +177,13 @@ st.subheader("🎯 Personalized Movie Recommendations")
 
 selected_user = st.selectbox("Select User", users)
 
-user_data = df[df["UserID"] == selected_user]
+# Only the selected user's partitions of the log are read
+user_data = attach_movies(
+    first_per_user(
+        load_events(events_log, users=[selected_user], movies=movie_ids), 60
+    ),
+    movies
+)
 fav_genre = (
     user_data.groupby("Genre")["UserRating"]
     .mean()
@@ -1,8 +1,11 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
 import os
 
+from catalog import load_movies
+from schemas import compile_plan
+from simulate import generate_interactions
+
 # -------------------------------------------------
 # PAGE CONFIG
 # -------------------------------------------------
@@ -22,38 +25,21 @@ if not os.path.exists(FILE_NAME):
     st.error("❌ asta.csv not found. Upload it to GitHub repo root.")
     st.stop()
 
-movies = pd.read_csv(FILE_NAME, encoding="latin1")
-movies.columns = movies.columns.str.strip()
-
-# 🔍 SHOW CSV COLUMNS (DEBUG – VERY IMPORTANT)
-st.subheader("📄 CSV Columns Detected")
-st.write(list(movies.columns))
-
 # -------------------------------------------------
-# AUTO COLUMN MAPPING (NO MORE KEYERROR)
+# SCHEMA ADAPTER (NO MORE KEYERROR)
 # -------------------------------------------------
-column_map = {
-    "MovieID": ["MovieID", "movie_id", "id"],
-    "MovieName": ["MovieName", "Title", "Movie", "Name"],
-    "Genre": ["Genre", "Genres", "Category"],
-    "BaseRating": ["BaseRating", "Rating", "IMDB_Rating", "Score"]
-}
-
-final_cols = {}
-
-for std_col, variants in column_map.items():
-    for v in variants:
-        if v in movies.columns:
-            final_cols[std_col] = v
-            break
-
-missing = set(column_map.keys()) - set(final_cols.keys())
-if missing:
-    st.error(f"❌ Missing required columns in CSV: {missing}")
+# The layout (asta.csv, asta1.csv or an unknown feed) is detected once
+# from the header and its column mapping / type plan is cached per file
+try:
+    movies = load_movies(FILE_NAME)
+except ValueError as e:
+    st.error(f"❌ {e}")
     st.stop()
 
-movies = movies.rename(columns={v: k for k, v in final_cols.items()})
-movies = movies[["MovieID", "MovieName", "Genre", "BaseRating"]].dropna()
+# 🔍 SHOW DETECTED LAYOUT (DEBUG)
+plan = compile_plan(FILE_NAME)
+st.subheader("📄 CSV Layout Detected")
+st.write(plan["layout"] or "unknown (alias mapping)", plan["rename"])
 
 st.success("✅ Movie dataset loaded & normalized successfully")
 
@@ -65,37 +51,17 @@ num_movies = st.sidebar.slider("Movies to Analyze", 100, 500, 250)
 movies = movies.head(num_movies)
 
 users = ["U01", "U02", "U03", "U04", "U05"]
-np.random.seed(42)
 
 # -------------------------------------------------
 # SYNTHETIC USER INTERACTIONS
 # -------------------------------------------------
-records = []
-dates = pd.date_range("2024-01-01", "2024-06-30")
-
-for user in users:
-    sample_movies = movies.sample(60, replace=False)
-    for _, row in sample_movies.iterrows():
-        records.append([
-            user,
-            row["MovieID"],
-            row["MovieName"],
-            row["Genre"],
-            round(np.random.normal(row["BaseRating"], 0.5), 1),
-            np.random.randint(60, 180),
-            np.random.choice(dates)
-        ])
-
-df = pd.DataFrame(
-    records,
-    columns=[
-        "UserID", "MovieID", "MovieName",
-        "Genre", "UserRating", "WatchTime", "WatchDate"
-    ]
+# 60 distinct movies per user, rating ~ Normal(BaseRating, 0.5) clipped
+# to 1-5, drawn for all users at once (seeded numpy Generator)
+df = generate_interactions(
+    movies, users, [np.arange(len(movies))],
+    per_user=60, sigma=0.5, seed=42
 )
 
-df["UserRating"] = df["UserRating"].clip(1, 5)
-
 # -------------------------------------------------
 # DATA PREVIEW
 # -------------------------------------------------
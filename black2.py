@@ -1,8 +1,10 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
 import os
 
+from catalog import load_movies
+from simulate import generate_interactions
+
 # -------------------------------------------------
 # PAGE CONFIG
 # -------------------------------------------------
@@ -22,35 +24,7 @@ if not os.path.exists(FILE_NAME):
     st.error("❌ asta.csv not found. Upload it to GitHub repo root.")
     st.stop()
 
-movies = pd.read_csv(FILE_NAME, encoding="latin1")
-movies.columns = movies.columns.str.strip()
-
-# SHOW CSV COLUMNS
-st.subheader("📄 CSV Columns Detected")
-st.write(list(movies.columns))
-
-# -------------------------------------------------
-# FIX COLUMN NAMES (BASED ON YOUR CSV)
-# -------------------------------------------------
-movies = movies.rename(columns={
-    "Unnamed: 0": "MovieID",
-    "Name of movie": "MovieName",
-    "Movie Rating": "BaseRating"
-})
-
-# CHECK REQUIRED COLUMNS
-required_cols = ["MovieID", "MovieName", "Genre", "BaseRating"]
-missing = [c for c in required_cols if c not in movies.columns]
-
-if missing:
-    st.error(f"❌ Missing required columns: {missing}")
-    st.stop()
-
-movies = movies[required_cols].dropna()
-
-# Ensure numeric rating
-movies["BaseRating"] = pd.to_numeric(movies["BaseRating"], errors="coerce")
-movies = movies.dropna()
+movies = load_movies(FILE_NAME)
 
 st.success("✅ Movie dataset loaded successfully")
 
@@ -62,37 +36,17 @@ num_movies = st.sidebar.slider("Movies to Analyze", 100, 500, 250)
 movies = movies.head(num_movies)
 
 users = ["U01", "U02", "U03", "U04", "U05"]
-np.random.seed(42)
 
 # -------------------------------------------------
 # SYNTHETIC USER INTERACTIONS
 # -------------------------------------------------
-records = []
-dates = pd.date_range("2024-01-01", "2024-06-30")
-
-for user in users:
-    sample_movies = movies.sample(60, replace=False)
-    for _, row in sample_movies.iterrows():
-        records.append([
-            user,
-            row["MovieID"],
-            row["MovieName"],
-            row["Genre"],
-            round(np.random.normal(row["BaseRating"], 0.4), 1),
-            np.random.randint(60, 180),
-            np.random.choice(dates)
-        ])
-
-df = pd.DataFrame(
-    records,
-    columns=[
-        "UserID", "MovieID", "MovieName",
-        "Genre", "UserRating", "WatchTime", "WatchDate"
-    ]
+# 60 distinct movies per user, rating ~ Normal(BaseRating, 0.4) clipped
+# to 1-5, drawn for all users at once (seeded numpy Generator)
+df = generate_interactions(
+    movies, users, [np.arange(len(movies))],
+    per_user=60, sigma=0.4, seed=42
 )
 
-df["UserRating"] = df["UserRating"].clip(1, 5)
-
 # -------------------------------------------------
 # DATA PREVIEW
 # -------------------------------------------------
@@ -1,8 +1,11 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
 import os
 
+from catalog import load_catalog
+from genres import GENRE_INDEX, genre_lists
+from simulate import generate_interactions, genre_samplers
+
 # =================================================
 # PAGE CONFIG
 # =================================================
@@ -24,18 +27,9 @@ if not os.path.exists(FILE_NAME):
     st.error("❌ asta.csv not found")
     st.stop()
 
-movies = pd.read_csv(FILE_NAME, encoding="latin1")
-movies.columns = movies.columns.str.strip()
-
-movies = movies.rename(columns={
-    "Unnamed: 0": "MovieID",
-    "Name of movie": "MovieName",
-    "Movie Rating": "BaseRating"
-})
-
-movies = movies[["MovieID", "MovieName", "Genre", "BaseRating"]].dropna()
-movies["BaseRating"] = pd.to_numeric(movies["BaseRating"], errors="coerce")
-movies = movies.dropna()
+# Frame and genre index of one catalog version
+catalog = load_catalog(FILE_NAME)
+movies = catalog.movies
 
 # =================================================
 # SIDEBAR CONTROL
@@ -62,55 +56,33 @@ user_preferences = {
     "U05": ["Fantasy", "Drama", "Comedy"]  # Updated: Romance -> Fantasy
 }
 
-np.random.seed(42)
-records = []
-dates = pd.date_range("2024-01-01", "2024-06-30")
-
-for user, genres in user_preferences.items():
+# Genre index of the catalog (built once per file version); movies is
+# a head() of the catalog, so its rows are the index's first rows
+genre_index = catalog.derived[GENRE_INDEX]
 
-    # Step 1: Get preferred genre movies
-    preferred_movies = movies[
-        movies["Genre"].str.contains("|".join(genres), case=False, na=False)
-    ]
-
-    # Step 2: If still less, sample with replacement (only similar genres)
-    if len(preferred_movies) < 60:
-        preferred_movies = preferred_movies.sample(
-            n=60, replace=True
-        )
-    else:
-        preferred_movies = preferred_movies.sample(
-            n=60, replace=False
-        )
+# Step 1: Get preferred genre movies (one weighted sampler per user,
+# from the prebuilt genre index: no string scan per rerun); movies
+# matching more of a user's genres are drawn more often
+pools = genre_samplers(movies, user_preferences.values(), index=genre_index)
 
-    # Step 3: Generate interactions
-    for _, row in preferred_movies.iterrows():
-
-        # Preference-based rating
-        if any(g.lower() in row["Genre"].lower() for g in genres):
-            rating = np.random.randint(4, 6)  # 4–5 for liked genres
-        else:
-            rating = np.random.randint(2, 4)  # 2–3 otherwise
-
-        records.append([
-            user,
-            row["MovieID"],
-            row["MovieName"],
-            row["Genre"],
-            rating,                         # ⭐ different ratings
-            np.random.randint(60, 180),
-            np.random.choice(dates)
-        ])
-
-df = pd.DataFrame(records, columns=[
-    "UserID", "MovieID", "MovieName",
-    "Genre", "UserRating", "WatchTime", "WatchDate"
-])
+# Step 2 + 3: 60 movies per user from their pool (with replacement
+# only if the pool has fewer), rated 4–5 since they match a liked
+# genre, all users generated at once
+df = generate_interactions(
+    movies, list(user_preferences), pools, per_user=60, seed=42
+)
 
 # =================================================
 # NORMALIZE GENRES
 # =================================================
-df["GenreList"] = df["Genre"].str.split(", ")
+# Genre is canonical since ingest; GenreList shares its integer codes
+df["GenreList"] = genre_lists(df["Genre"])
+
+# Catalog row of every interaction; with the genre index this is the
+# sparse interaction x genre matrix, so the genre counts below are
+# bincounts over it instead of exploded copies of df
+movie_rows = pd.Index(movies["MovieID"]).get_indexer(df["MovieID"])
+user_genre_views = genre_index.user_genre_views(movie_rows, df["UserID"])
 
 # =================================================
 # USER–MOVIE DATA VIEW
@@ -143,9 +115,10 @@ c4.metric("Avg Watch Time", int(df["WatchTime"].mean()))
 # =================================================
 st.subheader("🎭 Genre Popularity (Simple)")
 
+genre_views = genre_index.genre_views(movie_rows)
 genre_popularity = (
-    df.explode("GenreList")["GenreList"]
-      .value_counts()
+    genre_views[genre_views > 0]
+      .sort_values(ascending=False, kind="stable")
       .reset_index()
 )
 
@@ -164,14 +137,13 @@ st.caption(
 st.subheader("👤 User Behaviour Analysis")
 
 user_behaviour = (
-    df.explode("GenreList")
-      .groupby("UserID")
+    df.groupby("UserID")
       .agg(
           MoviesWatched=("MovieID", "count"),
           AvgRating=("UserRating", "mean"),
-          AvgWatchTime=("WatchTime", "mean"),
-          FavoriteGenre=("GenreList", lambda x: x.value_counts().idxmax())
+          AvgWatchTime=("WatchTime", "mean")
       )
+      .assign(FavoriteGenre=user_genre_views.idxmax(axis=1))
       .reset_index()
 )
 
@@ -182,16 +154,10 @@ st.dataframe(user_behaviour, use_container_width=True)
 # =================================================
 st.subheader("📊 User Favourite Genre (Behaviour Result)")
 
-user_fav_genre = (
-    df.explode("GenreList")
-      .groupby(["UserID", "GenreList"])
-      .size()
-      .reset_index(name="WatchCount")
-)
-
-user_fav_genre = user_fav_genre.loc[
-    user_fav_genre.groupby("UserID")["WatchCount"].idxmax()
-]
+user_fav_genre = pd.DataFrame({
+    "GenreList": user_genre_views.idxmax(axis=1),
+    "WatchCount": user_genre_views.max(axis=1)
+}).reset_index()
 
 st.dataframe(user_fav_genre, use_container_width=True)
 st.bar_chart(user_fav_genre.set_index("UserID")[["WatchCount"]])
@@ -212,18 +178,15 @@ selected_user = st.selectbox(
 
 user_df = df[df["UserID"] == selected_user]
 
-fav_genre = (
-    user_df.explode("GenreList")["GenreList"]
-    .value_counts()
-    .idxmax()
-)
+fav_genre = user_genre_views.loc[selected_user].idxmax()
 
 st.success(f"🎯 Favorite Genre: {fav_genre}")
 
 watched_movies = set(user_df["MovieID"])
 
+# Genre filter = one bitmask test per movie, no regex scan
 user_recommendations = movies[
-    movies["Genre"].str.contains(fav_genre, case=False, na=False) &
+    genre_index.any_of([fav_genre], limit=len(movies)) &
     (~movies["MovieID"].isin(watched_movies))
 ].head(7)
 
@@ -256,7 +219,7 @@ if movie_input:
         main_genre = movie["Genre"].split(",")[0]
 
         similar = movies[
-            movies["Genre"].str.contains(main_genre, case=False, na=False) &
+            genre_index.any_of([main_genre], limit=len(movies)) &
             (movies["BaseRating"] >= movie["BaseRating"] - 0.5) &
             (movies["MovieID"] != movie["MovieID"])
         ].sort_values("BaseRating", ascending=False).head(10)
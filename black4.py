@@ -6,18 +6,33 @@
 # instead of streamlit.xxx every time
 import streamlit as st
 
-# pandas is used for data manipulation and analysis
-# It provides DataFrame (table-like structure)
-import pandas as pd
-
-# numpy is used for numerical operations
-# Here it is mainly used for random number generation
-import numpy as np
-
 # os module is used to interact with the operating system
 # Here we use it to check if the CSV file exists or not
 import os
 
+# load_catalog() parses and cleans the catalog once per file version
+# and reuses it across reruns instead of re-reading the CSV each time;
+# it hands out one version at a time (frame, indexes, quarantine)
+from catalog import load_catalog
+
+# watch() keeps the catalog fresh from a background thread, so a
+# replaced asta.csv is picked up without restarting the app
+from watcher import watch
+
+# incremental_interactions() builds the synthetic watch history with
+# array operations instead of a per-row loop and caches it per user;
+# population_table() simulates many more users for load testing
+# The genre index maps every genre to its movies once per file
+# version, so finding a user's candidate movies needs no text search;
+# the genre co-occurrence links each genre to the genres it is most
+# often paired with, to widen the similar-movie list (importing genres
+# registers both, so they are built with every catalog version)
+from genres import GENRE_COOCCURRENCE, GENRE_INDEX, genre_lists
+
+# aggregate_interactions() computes every dashboard metric in one pass
+from aggregate import aggregate_interactions
+from simulate import genre_pools, incremental_interactions, population_table
+
 
 # ===============================================================
 # PAGE CONFIGURATION (WEB PAGE SETTINGS)
@@ -50,6 +65,9 @@ st.caption("Dataset-based Movie Rating & User Behaviour Analysis")
 # Name of the CSV file that contains movie details
 FILE_NAME = "asta.csv"
 
+# Interaction rows shown in the data table
+SAMPLE_ROWS = 1_000
+
 # os.path.exists() checks whether the file is present in the folder
 if not os.path.exists(FILE_NAME):
     # If file is not found, show a red error message on the webpage
@@ -59,29 +77,31 @@ if not os.path.exists(FILE_NAME):
     # This avoids further errors in the app
     st.stop()
 
-# Read the CSV file into a pandas DataFrame
-# encoding="latin1" helps read special characters correctly
-movies = pd.read_csv(FILE_NAME, encoding="latin1")
-
-# Remove extra spaces from column names (cleaning step)
-movies.columns = movies.columns.str.strip()
-
-# Rename columns to simpler and consistent names
-movies = movies.rename(columns={
-    "Unnamed: 0": "MovieID",      # Unique ID for each movie
-    "Name of movie": "MovieName", # Movie title
-    "Movie Rating": "BaseRating"  # IMDb / base rating
-})
-
-# Select only the required columns and remove rows with missing values
-movies = movies[["MovieID", "MovieName", "Genre", "BaseRating"]].dropna()
-
-# Convert BaseRating column to numeric type
-# errors="coerce" converts invalid values to NaN
-movies["BaseRating"] = pd.to_numeric(movies["BaseRating"], errors="coerce")
-
-# Remove rows where BaseRating could not be converted
-movies = movies.dropna()
+# Load the cleaned catalog through the shared loader in catalog.py
+# The CSV is read, renamed, converted and cleaned only once per file
+# version; every rerun and every session gets the same cleaned frame
+# (MovieID, MovieName, Genre, BaseRating) until asta.csv changes
+# Start (once per process) the background watcher: when asta.csv
+# changes it rebuilds the catalog and its genre indexes off the
+# request path and swaps them in, while reruns keep using the current
+# version until then
+watch(FILE_NAME)
+
+# Everything this rerun uses comes from this one version, so a swap
+# in the middle of the rerun cannot mix two catalogs
+catalog = load_catalog(FILE_NAME)
+movies = catalog.movies
+
+# Rows with extra unquoted commas do not stop loading: they are either
+# repaired or kept aside in a quarantine table with their line numbers
+quarantine = catalog.quarantine
+
+if len(quarantine):
+    repaired = int(quarantine["Repaired"].sum())
+    st.sidebar.warning(
+        f"⚠️ {len(quarantine)} malformed rows: {repaired} repaired, "
+        f"{len(quarantine) - repaired} quarantined"
+    )
 
 
 # ===============================================================
@@ -102,6 +122,11 @@ num_movies = st.sidebar.slider(
 # Limit the dataset to only the selected number of movies
 movies = movies.head(num_movies)
 
+# Genre index of the full catalog: movies is its first rows, so
+# any_of(..., limit=len(movies)) is a boolean mask aligned with movies
+# (each movie's genres are a bitmask: one AND per movie, no regex)
+genre_index = catalog.derived[GENRE_INDEX]
+
 
 # ===============================================================
 # USER PREFERENCE MODEL (SIMULATED USERS)
@@ -117,44 +142,60 @@ user_preferences = {
     "U05": ["Romance"]
 }
 
-# Setting random seed ensures same random output every time
-# Useful for reproducibility
-np.random.seed(42)
-
-# Empty list to store user-movie interaction records
-records = []
-
-# Create a list of random dates for watch history
-dates = pd.date_range("2024-01-01", "2024-06-30")
-
-# Divide movies equally among users
-movies_per_user = num_movies // len(user_preferences)
+# Number of simulated users
+# 5 → the preset users above; larger values generate a population
+# with random genre tastes to test the app at realistic user counts
+# (bigger populations: `python simulate.py population 1000000`, they
+# are too slow and too large to rebuild on an interactive rerun)
+num_users = st.sidebar.select_slider(
+    "Simulated users",
+    options=[5, 1_000, 10_000],
+    value=5
+)
 
-# Loop through each user and their genre preference
-for user, genres in user_preferences.items():
+# How a simulated population (more than 5 users) picks movies
+# "Genre preferences" → mostly movies of the genres each user likes
+# "Zipf popularity"   → a few hit movies get most views, users watch in
+#                       bursty sessions and watch time follows runtime
+#                       (production-like skew for benchmarking)
+load_profile = st.sidebar.selectbox(
+    "Load profile",
+    ["Genre preferences", "Zipf popularity"]
+)
 
-    # Filter movies that match the user's preferred genre
-    preferred_movies = movies[
-        movies["Genre"].str.contains("|".join(genres), case=False, na=False)
-    ].head(movies_per_user)
+if num_users == len(user_preferences):
+    # Divide movies equally among users
+    movies_per_user = num_movies // len(user_preferences)
 
-    # For each selected movie, create an interaction record
-    for _, row in preferred_movies.iterrows():
-        records.append([
-            user,                         # User ID
-            row["MovieID"],              # Movie ID
-            row["MovieName"],            # Movie name
-            row["Genre"],                # Movie genre
-            np.random.randint(4, 6),     # Random user rating (4 or 5)
-            np.random.randint(60, 180),  # Watch time in minutes
-            np.random.choice(dates)      # Random watch date
-        ])
+    # For each user, the first movies_per_user movies matching their
+    # preferred genres (row positions into movies)
+    pools = genre_pools(
+        movies, user_preferences.values(), limit=movies_per_user,
+        index=genre_index
+    )
 
-# Convert interaction records list into a DataFrame
-df = pd.DataFrame(records, columns=[
-    "UserID", "MovieID", "MovieName",
-    "Genre", "UserRating", "WatchTime", "WatchDate"
-])
+    # Create one interaction record per pool movie for every user:
+    #   UserRating → random 4 or 5 (liked genre)
+    #   WatchTime  → random minutes between 60 and 179
+    #   WatchDate  → random day between 2024-01-01 and 2024-06-30
+    # Each user has their own fixed random stream (reproducibility), and
+    # results are cached per dataset version and slider value: moving
+    # the slider only re-simulates users whose movie pool changed
+    df = incremental_interactions(
+        movies, list(user_preferences), pools,
+        version=catalog.version, key=num_movies, seed=42
+    )
+else:
+    # Every simulated user gets a preference weight per genre and
+    # watches about 60 movies, mostly from the genres they like (or,
+    # with the Zipf profile, mostly the most popular movies). The
+    # table is cached per dataset version and settings, so reruns that
+    # keep them (any other widget) do not simulate it again
+    df = population_table(
+        movies, num_users, version=catalog.version,
+        key=num_movies, seed=42,
+        profile="zipf" if load_profile == "Zipf popularity" else "genre"
+    )
 
 
 # ===============================================================
@@ -162,13 +203,16 @@ df = pd.DataFrame(records, columns=[
 # ===============================================================
 
 # Some movies have multiple genres separated by commas
-# This splits them into a list and cleans formatting
-df["GenreList"] = (
-    df["Genre"]
-    .str.split(",")                          # Split genres
-    .apply(lambda x: [g.strip().title() for g in x])  
-    # Remove spaces and capitalize
-)
+# Genre is already cleaned at load time (padding stripped, names
+# title-cased, ", " between genres), so the list of every distinct
+# Genre is built once and rows keep the same small integer code
+df["GenreList"] = genre_lists(df["Genre"])
+
+# Every number the sections below show (KPIs, genre popularity, user
+# behaviour and activity, favourite genres) comes from this single
+# pass over df: users and catalog rows are turned into integer keys
+# once and each metric is a bincount over them
+metrics = aggregate_interactions(df, movies, genre_index)
 
 
 # ===============================================================
@@ -178,8 +222,10 @@ df["GenreList"] = (
 # Section heading
 st.subheader("📂 User–Movie Interaction Data")
 
-# Display the DataFrame as an interactive table
-st.dataframe(df, use_container_width=True)
+# Display the first rows as an interactive table (sending every row
+# of a large population to the browser would dominate the rerun)
+st.dataframe(df.head(SAMPLE_ROWS), use_container_width=True)
+st.caption(f"Showing {min(SAMPLE_ROWS, len(df)):,} of {len(df):,} rows")
 
 
 # ===============================================================
@@ -192,16 +238,16 @@ st.subheader("📌 Platform Overview")
 c1, c2, c3, c4 = st.columns(4)
 
 # Number of unique users on the platform
-c1.metric("Users", df["UserID"].nunique())
+c1.metric("Users", metrics.num_users)
 
 # Number of unique movies watched
-c2.metric("Movies Watched", df["MovieID"].nunique())
+c2.metric("Movies Watched", metrics.movies_watched)
 
 # Average rating given by users
-c3.metric("Avg Rating", round(df["UserRating"].mean(), 2))
+c3.metric("Avg Rating", round(metrics.avg_rating, 2))
 
 # Average watch time across all users
-c4.metric("Avg Watch Time", int(df["WatchTime"].mean()))
+c4.metric("Avg Watch Time", int(metrics.avg_watch_time))
 
 
 # ===============================================================
@@ -210,15 +256,9 @@ c4.metric("Avg Watch Time", int(df["WatchTime"].mean()))
 
 st.subheader("🎭 Genre Popularity")
 
-# Explode GenreList so each genre is counted separately
-genre_popularity = (
-    df.explode("GenreList")["GenreList"]
-    .value_counts()        # Count views per genre
-    .reset_index()
-)
-
-# Rename columns for clarity
-genre_popularity.columns = ["Genre", "TotalViews"]
+# Each watch counts once for every genre of its movie
+# (columns Genre / TotalViews, most viewed first)
+genre_popularity = metrics.genre_popularity
 
 # Display genre popularity table
 st.dataframe(genre_popularity, use_container_width=True)
@@ -233,19 +273,12 @@ st.bar_chart(genre_popularity.set_index("Genre"))
 
 st.subheader("👤 User Behaviour Analysis")
 
-# Group data by user and calculate behaviour statistics
-user_behaviour = (
-    df.explode("GenreList")
-    .groupby("UserID")
-    .agg(
-        MoviesWatched=("MovieID", "nunique"),   # Unique movies watched
-        AvgRating=("UserRating", "mean"),       # Average rating
-        AvgWatchTime=("WatchTime", "mean"),     # Average watch time
-        FavoriteGenre=("GenreList", lambda x: x.value_counts().idxmax())
-        # Most watched genre
-    )
-    .reset_index()
-)
+# Behaviour statistics per user:
+#   MoviesWatched → unique movies watched
+#   AvgRating     → average rating
+#   AvgWatchTime  → average watch time
+#   FavoriteGenre → most watched genre
+user_behaviour = metrics.user_behaviour
 
 # Display user behaviour table
 st.dataframe(user_behaviour, use_container_width=True)
@@ -258,11 +291,7 @@ st.dataframe(user_behaviour, use_container_width=True)
 st.subheader("📊 User Activity Overview")
 
 # Count total movies watched by each user
-user_activity = (
-    df.groupby("UserID")["MovieID"]
-    .count()
-    .reset_index(name="MoviesWatched")
-)
+user_activity = metrics.user_activity
 
 # Display bar chart for user activity
 st.bar_chart(user_activity.set_index("UserID"))
@@ -277,16 +306,11 @@ st.subheader("🎯 User-Based Recommendation")
 # Dropdown menu to select a user
 selected_user = st.selectbox(
     "Select User",
-    df["UserID"].unique()
+    metrics.users
 )
 
 # Find the most frequently watched genre for the selected user
-user_fav_genre = (
-    df[df["UserID"] == selected_user]
-    .explode("GenreList")["GenreList"]
-    .value_counts()
-    .idxmax()
-)
+user_fav_genre = metrics.favorite_genre(selected_user)
 
 # Display the user's favorite genre
 st.success(f"💖 Favorite Genre: {user_fav_genre}")
@@ -294,7 +318,7 @@ st.success(f"💖 Favorite Genre: {user_fav_genre}")
 # Recommend top-rated movies from that genre
 personalized_recommendations = (
     movies[
-        movies["Genre"].str.contains(user_fav_genre, case=False, na=False)
+        genre_index.any_of([user_fav_genre], limit=len(movies))
     ]
     .sort_values("BaseRating", ascending=False)
     .head(7)
@@ -337,12 +361,27 @@ if movie_input:
         # Extract the primary genre for similarity
         main_genre = movie["Genre"].split(",")[0].strip()
 
-        # Find movies with similar genre and rating
-        similar = movies[
-            movies["Genre"].str.contains(main_genre, case=False, na=False) &
-            (movies["BaseRating"] >= movie["BaseRating"] - 0.5) &
-            (movies["MovieID"] != movie["MovieID"])
-        ].sort_values("BaseRating", ascending=False).head(10)
+        # Genres that appear together with it more often than chance
+        # (co-occurrence lift, counted once per catalog version)
+        related_genres = catalog.derived[GENRE_COOCCURRENCE].related(
+            main_genre
+        )
+        if related_genres:
+            st.caption(f"Related genres: {', '.join(related_genres)}")
+
+        # Find movies with similar genre and rating: movies of the
+        # primary genre first, then movies of a related genre
+        similar = movies.assign(
+            SameGenre=genre_index.any_of([main_genre], limit=len(movies))
+        )
+        similar = similar[
+            (similar["SameGenre"] |
+             genre_index.any_of(related_genres, limit=len(movies))) &
+            (similar["BaseRating"] >= movie["BaseRating"] - 0.5) &
+            (similar["MovieID"] != movie["MovieID"])
+        ].sort_values(
+            ["SameGenre", "BaseRating"], ascending=False, kind="stable"
+        ).head(10)
 
         # Display similar movie recommendations
         st.subheader("🎯 Similar Movies")
@@ -0,0 +1,163 @@
+"""
+Actor index built from the catalog's Star column.
+
+asta.csv stores each movie's cast as a Python-literal list string
+("['Tim Robbins', 'Morgan Freeman', ...]"); asta1.csv stores a single
+name. build_actor_index() parses the whole column with vectorized
+string operations (no per-row ast.literal_eval), interns every actor
+name once and stores the cast in CSR form:
+
+    movie_offsets[i]:movie_offsets[i + 1]  -> slice of movie_actors
+    actor_offsets[a]:actor_offsets[a + 1]  -> slice of actor_movies
+
+so "cast of this movie", "movies with this star" and co-star queries
+are array slices.
+"""
+
+import os
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from schemas import compile_plan
+
+# With pyarrow, split() yields Arrow list arrays and explode() is a
+# flatten; without it the same calls go through Python lists
+try:
+    import pyarrow as pa
+    TEXT_DTYPE = pd.ArrowDtype(pa.string())
+except ImportError:
+    TEXT_DTYPE = "string"
+
+
+# Raw header name of the cast column in both catalog layouts
+STAR_COLUMN = "Star"
+
+# Closing quote, comma, opening quote between two names as written by
+# Python's list repr (names with an apostrophe are double-quoted)
+NAME_SEPARATORS = ["', '", "', \"", "\", '", "\", \""]
+
+# Built indexes, keyed by absolute path -> (file stat, index)
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+@dataclass
+class ActorIndex:
+    """Interned actor vocabulary plus movie<->actor CSR arrays."""
+
+    movie_ids: np.ndarray        # MovieID of each CSR row
+    actors: pd.Index             # actor id -> actor name
+    movie_offsets: np.ndarray    # len(movie_ids) + 1
+    movie_actors: np.ndarray     # actor ids, grouped by movie row
+    actor_offsets: np.ndarray    # len(actors) + 1
+    actor_movies: np.ndarray     # movie rows, grouped by actor id
+
+    def actor_id(self, name):
+        """Actor id for an exact name, or -1 when unknown."""
+        return int(self.actors.get_indexer([name])[0])
+
+    def cast_of(self, row):
+        """Actor names of the movie at CSR row `row`."""
+        start, end = self.movie_offsets[row], self.movie_offsets[row + 1]
+        return self.actors[self.movie_actors[start:end]]
+
+    def movies_with(self, name):
+        """MovieIDs of every movie the actor appears in."""
+        actor = self.actor_id(name)
+        if actor < 0:
+            return self.movie_ids[:0]
+        start, end = self.actor_offsets[actor], self.actor_offsets[actor + 1]
+        return self.movie_ids[self.actor_movies[start:end]]
+
+    def co_stars(self, name):
+        """Names of actors sharing a movie with `name`, most shared first."""
+        actor = self.actor_id(name)
+        if actor < 0:
+            return pd.Series(dtype="int64")
+
+        start, end = self.actor_offsets[actor], self.actor_offsets[actor + 1]
+        rows = self.actor_movies[start:end]
+        # Concatenate the cast slices of every movie the actor is in
+        starts = self.movie_offsets[rows]
+        lengths = self.movie_offsets[rows + 1] - starts
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        positions += np.arange(lengths.sum())
+        partners = self.movie_actors[positions]
+        partners = partners[partners != actor]
+
+        counts = np.bincount(partners, minlength=len(self.actors))
+        found = np.flatnonzero(counts)
+        order = np.argsort(-counts[found], kind="stable")
+        return pd.Series(
+            counts[found][order], index=self.actors[found[order]]
+        )
+
+
+def parse_star_lists(values):
+    """
+    Split list-literal cast strings into one name per row.
+
+    Returns a Series of names whose index is the position of the
+    source row, in source order.
+    """
+    text = values.astype(TEXT_DTYPE).reset_index(drop=True)
+    text = text.str.strip().str.strip("[]")
+    for separator in NAME_SEPARATORS:
+        text = text.str.replace(separator, "\x1f", regex=False)
+
+    names = text.str.split("\x1f").explode().str.strip().str.strip("'\"")
+    return names[names.notna() & (names != "")]
+
+
+def build_actor_index(movie_ids, stars):
+    """Build an ActorIndex from parallel MovieID and Star columns."""
+    movie_ids = np.asarray(movie_ids)
+    names = parse_star_lists(stars)
+    rows = names.index.to_numpy(dtype=np.int64)
+
+    codes, actors = pd.factorize(names, sort=False)
+    codes = codes.astype(np.int32)
+
+    counts = np.bincount(rows, minlength=len(movie_ids))
+    movie_offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    # Transpose: stable sort by actor keeps movie rows in order
+    order = np.argsort(codes, kind="stable")
+    actor_counts = np.bincount(codes, minlength=len(actors))
+    actor_offsets = np.concatenate([[0], np.cumsum(actor_counts)])
+
+    return ActorIndex(
+        movie_ids=movie_ids,
+        actors=pd.Index(actors, name="Actor"),
+        movie_offsets=movie_offsets,
+        movie_actors=codes,
+        actor_offsets=actor_offsets,
+        actor_movies=rows[order].astype(np.int32)
+    )
+
+
+def load_actor_index(path):
+    """ActorIndex for a catalog file, built once per file version."""
+    key = os.path.abspath(path)
+    info = os.stat(path)
+    stat = (info.st_mtime_ns, info.st_size)
+
+    with _indexes_lock:
+        cached = _indexes.get(key)
+        if cached is not None and cached[0] == stat:
+            return cached[1]
+
+        plan = compile_plan(path)
+        id_column = next(
+            raw for raw, name in plan["rename"].items() if name == "MovieID"
+        )
+        raw = pd.read_csv(
+            path, usecols=[id_column, STAR_COLUMN],
+            encoding=plan["read"]["encoding"]
+        )
+        index = build_actor_index(raw[id_column], raw[STAR_COLUMN])
+        _indexes[key] = (stat, index)
+        return index
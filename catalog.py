@@ -0,0 +1,524 @@
+"""
+Movie catalog loading shared by the black*.py Streamlit apps.
+
+Streamlit re-executes the whole app script on every widget interaction,
+so reading and cleaning asta.csv inline is paid again on every slider
+move or keystroke. load_movies() parses and cleans a catalog file once
+per file version and hands the same cleaned DataFrame to every rerun
+and every session in the process.
+
+The returned frame is shared: callers must treat it as read-only and
+derive new frames (head, filters, copies) instead of modifying it.
+
+On a cache miss the cleaned catalog is read from a columnar Feather
+snapshot next to the CSV (.snapshots/<name>.v<format>.<digest>.feather)
+and the CSV text is parsed only when there is no snapshot for the
+file's current content digest and SNAPSHOT_FORMAT.
+Rows with surplus unquoted fields do not stop the fast parser: they
+are repaired or quarantined (see quarantine.py), and load_quarantine()
+returns the side table the apps report.
+
+Structures derived from the cleaned frame (e.g. the genre index) are
+registered with register_derived() and built with every new version
+before it becomes visible. load_catalog() returns one version as a
+whole (digest, frame, quarantine table, derived structures), so a
+rerun that takes everything from it never mixes two versions.
+Snapshots can be built ahead of time with:
+
+    python catalog.py asta.csv asta1.csv
+"""
+
+import hashlib
+import os
+import sys
+import threading
+from dataclasses import dataclass
+
+import pandas as pd
+
+from quarantine import (
+    empty_quarantine, iter_tolerant, read_fast, read_tolerant
+)
+from schemas import REQUIRED_COLUMNS, apply_plan, compile_plan
+
+
+# Columns every app works with after cleanup
+MOVIE_COLUMNS = REQUIRED_COLUMNS
+
+# Folder (next to the CSV) that holds the columnar snapshots
+SNAPSHOT_DIR = ".snapshots"
+
+# Layout version of the cleaned frame, part of every snapshot name.
+# Bump it whenever parsing or cleanup changes the cleaned frame, so
+# snapshots written by older code are rebuilt instead of reused
+SNAPSHOT_FORMAT = 4
+
+# Rows per chunk for streaming ingestion of large catalogs
+CHUNK_SIZE = 100_000
+
+# Separators used between genres ("Crime, Drama" / "Crime|Drama")
+GENRE_SEPARATOR = r"\s*[,|]\s*"
+
+# Cached catalogs, keyed by absolute file path
+# Each entry holds the file stat, content digest, cleaned frame,
+# quarantine table and derived structures of one version
+_cache = {}
+_cache_lock = threading.Lock()
+
+# One build lock per path: a cold parse runs outside _cache_lock, and
+# concurrent loads of the same path wait for it instead of parsing again
+_build_locks = {}
+
+# Builders of derived structures, by name, in registration order
+_derived = {}
+
+# Paths kept fresh by a background watcher (see watcher.py): reruns get
+# the cached frame without any file check and the watcher swaps in a
+# new entry once the new version is fully built
+_watched = set()
+
+
+# =================================================
+# FILE VERSIONING
+# =================================================
+def file_stat(path):
+    """Cheap change check: (modification time in ns, size in bytes)."""
+    info = os.stat(path)
+    return (info.st_mtime_ns, info.st_size)
+
+
+def content_hash(path, chunk_size=1 << 20):
+    """Digest of the file contents, read in fixed-size blocks."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# =================================================
+# PARSE + CLEAN
+# =================================================
+def clean_movies(raw, plan):
+    """
+    Apply the file's load plan and the apps' cleanup to a freshly read
+    catalog frame.
+
+    The app columns come first; the remaining parsed columns are kept
+    after them under their canonical names. Only rows missing an app
+    column are dropped.
+    """
+    movies = apply_plan(raw, plan)
+
+    other_columns = [c for c in movies.columns if c not in MOVIE_COLUMNS]
+    movies = movies[MOVIE_COLUMNS + other_columns]
+    movies["BaseRating"] = pd.to_numeric(movies["BaseRating"], errors="coerce")
+    return movies.dropna(subset=MOVIE_COLUMNS).reset_index(drop=True)
+
+
+def parse_catalog(path):
+    """
+    Parse and clean a catalog CSV, ignoring any snapshot.
+
+    Returns (cleaned movies, quarantine table). A strict C-engine read
+    is tried first; if it finds a malformed row the file is re-read
+    with the tolerant C-engine reader instead of the Python engine.
+    """
+    plan = compile_plan(path)
+    try:
+        raw = read_fast(path, plan)
+        quarantine = empty_quarantine()
+    except ValueError:
+        raw, quarantine = read_tolerant(path, plan)
+    return clean_movies(raw, plan), quarantine
+
+
+def parse_movies(path):
+    """Parse and clean a catalog CSV, ignoring any snapshot."""
+    return parse_catalog(path)[0]
+
+
+# =================================================
+# COLUMNAR SNAPSHOTS
+# =================================================
+def snapshot_stem(path, digest=None):
+    """
+    Snapshot location of a catalog CSV without suffix
+    (<name>.v<N>.<digest>), for the content `digest` (default: the
+    file's current one).
+    """
+    if digest is None:
+        digest = content_hash(path)
+    folder, name = os.path.split(os.path.abspath(path))
+    stem = os.path.splitext(name)[0]
+    return os.path.join(
+        folder, SNAPSHOT_DIR, f"{stem}.v{SNAPSHOT_FORMAT}.{digest}"
+    )
+
+
+def snapshot_path(path, digest=None):
+    """Location of the Feather snapshot for a catalog CSV."""
+    return snapshot_stem(path, digest) + ".feather"
+
+
+def quarantine_path(path, digest=None):
+    """Location of the quarantine side table next to the snapshot."""
+    return snapshot_stem(path, digest) + ".quarantine.feather"
+
+
+def snapshot_is_fresh(path, digest=None):
+    """True when a snapshot exists for the CSV's content digest."""
+    return os.path.exists(snapshot_path(path, digest)) \
+        and os.path.exists(quarantine_path(path, digest))
+
+
+def build_snapshot(path, digest=None):
+    """
+    Parse the CSV and write its cleaned frame as a Feather snapshot,
+    plus the quarantine side table, named after the content `digest`.
+
+    Files are written under a temporary name and moved into place,
+    so readers never see a half-written snapshot. If the file changed
+    while it was parsed, nothing is written: the frame would be filed
+    under a digest it does not match. Returns (movies, quarantine).
+    """
+    if digest is None:
+        digest = content_hash(path)
+    movies, quarantine = parse_catalog(path)
+    if content_hash(path) != digest:
+        return movies, quarantine
+    snapshot = snapshot_path(path, digest)
+    os.makedirs(os.path.dirname(snapshot), exist_ok=True)
+
+    for frame, target in [(quarantine, quarantine_path(path, digest)),
+                          (movies, snapshot)]:
+        tmp = f"{target}.{os.getpid()}.tmp"
+        frame.to_feather(tmp)
+        os.replace(tmp, target)
+
+    # Snapshots of other (or no) formats and contents are never read again
+    folder, current = os.path.split(snapshot_stem(path, digest))
+    stem = current.split(".v", 1)[0]
+    stale = {f"{stem}.feather", f"{stem}.quarantine.feather"}
+    for name in os.listdir(folder):
+        if name in stale or name.startswith(f"{stem}.v") \
+                and name.endswith(".feather") \
+                and not name.startswith(f"{current}."):
+            try:
+                os.remove(os.path.join(folder, name))
+            except OSError:
+                pass
+    return movies, quarantine
+
+
+def read_catalog(path, digest=None):
+    """
+    Read the cleaned catalog and its quarantine table, bypassing the
+    in-process cache.
+
+    Loads the Feather snapshot of the CSV's content `digest` (default:
+    its current one) and builds it when there is none. Without pyarrow
+    the CSV is parsed directly.
+    """
+    if digest is None:
+        digest = content_hash(path)
+    try:
+        if snapshot_is_fresh(path, digest):
+            try:
+                return (pd.read_feather(snapshot_path(path, digest)),
+                        pd.read_feather(quarantine_path(path, digest)))
+            except OSError:
+                pass    # pruned by a concurrent build: write it again
+        return build_snapshot(path, digest)
+    except ImportError:
+        return parse_catalog(path)
+
+
+def read_movies(path, digest=None):
+    """Read the cleaned catalog, bypassing the in-process cache."""
+    return read_catalog(path, digest)[0]
+
+
+# =================================================
+# CACHED LOADER
+# =================================================
+@dataclass(frozen=True)
+class CatalogVersion:
+    """One version of a catalog file, as load_catalog() returns it."""
+
+    version: str               # content digest (catalog_version())
+    movies: pd.DataFrame       # cleaned catalog, shared and read-only
+    quarantine: pd.DataFrame   # malformed rows (see load_quarantine())
+    derived: dict              # register_derived() name -> structure
+
+
+def register_derived(name, build):
+    """
+    Build `name` with every catalog version from now on.
+
+    build(movies, derived, previous) gets the version's cleaned frame,
+    the structures already built for it (in registration order) and
+    those of the path's previous version ({} if none), e.g. to update
+    instead of rebuild. It runs before the version becomes visible: in
+    refresh() that is on the watcher's thread, off the request path.
+    """
+    with _cache_lock:
+        _derived[name] = build
+
+
+def _build_lock(key):
+    """Lock serializing the builds of one cached path."""
+    with _cache_lock:
+        return _build_locks.setdefault(key, threading.Lock())
+
+
+def _derive(movies, derived, previous, builders):
+    """Run the `builders` missing from `derived`, in order."""
+    derived = dict(derived)
+    for name, build in builders.items():
+        if name not in derived:
+            derived[name] = build(movies, derived, previous)
+    return derived
+
+
+def _build_entry(path, stat, digest, previous):
+    """New cache entry for one version, derived structures included."""
+    movies, quarantine = read_catalog(path, digest)
+    with _cache_lock:
+        builders = dict(_derived)
+    before = {} if previous is None else previous["derived"]
+    return {
+        "stat": stat, "digest": digest, "movies": movies,
+        "quarantine": quarantine,
+        "derived": _derive(movies, {}, before, builders)
+    }
+
+
+def load_movies(path):
+    """
+    Return the cleaned catalog for `path`, parsing it at most once per
+    file version.
+
+    The stat tuple is checked on every call. When it changes, the
+    content digest decides whether the file really changed (a `touch`
+    or a copy of identical bytes keeps the cached frame). Watched
+    paths skip the check; their watcher refreshes them.
+
+    Hashing and parsing happen outside the cache lock, under the path's
+    build lock, so a cold load only makes loads of the same path wait.
+    """
+    key = os.path.abspath(path)
+
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None and key in _watched:
+            return entry["movies"]
+
+    stat = file_stat(path)
+
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None and entry["stat"] == stat:
+            return entry["movies"]
+
+    with _build_lock(key):
+        # Another thread may have built this version while we waited
+        with _cache_lock:
+            entry = _cache.get(key)
+            if entry is not None and entry["stat"] == stat:
+                return entry["movies"]
+
+        digest = content_hash(path)
+        with _cache_lock:
+            entry = _cache.get(key)
+            if entry is not None and entry["digest"] == digest:
+                entry["stat"] = stat
+                return entry["movies"]
+
+        entry = _build_entry(path, stat, digest, entry)
+        with _cache_lock:
+            _cache[key] = entry
+        return entry["movies"]
+
+
+def refresh(path):
+    """
+    Rebuild the cached catalog for the file's current contents.
+
+    The new frame, its quarantine table and its derived structures are
+    built without holding the cache lock and then installed as a new
+    entry in one assignment, so readers keep getting the previous
+    version until the new one is complete and callers that already
+    hold the old one are unaffected. Returns True when a new version
+    was installed.
+    """
+    key = os.path.abspath(path)
+
+    with _build_lock(key):
+        stat = file_stat(path)
+        digest = content_hash(path)
+
+        with _cache_lock:
+            entry = _cache.get(key)
+            if entry is not None and entry["digest"] == digest:
+                entry["stat"] = stat
+                return False
+
+        entry = _build_entry(path, stat, digest, entry)
+
+        with _cache_lock:
+            _cache[key] = entry
+        return True
+
+
+def set_watched(path, watched=True):
+    """Mark `path` as refreshed by a watcher (or hand it back to load_movies)."""
+    key = os.path.abspath(path)
+    with _cache_lock:
+        if watched:
+            _watched.add(key)
+        else:
+            _watched.discard(key)
+
+
+def _current_entry(path):
+    """Cache entry of the version load_movies() currently serves."""
+    load_movies(path)
+    with _cache_lock:
+        return _cache[os.path.abspath(path)]
+
+
+def load_catalog(path):
+    """
+    The current version of `path` as a CatalogVersion: digest, cleaned
+    frame, quarantine table and derived structures, all of one version.
+
+    Structures registered after the version was loaded are built here
+    once and kept with it.
+    """
+    entry = _current_entry(path)
+    with _cache_lock:
+        builders = dict(_derived)
+
+    if builders.keys() - entry["derived"].keys():
+        derived = _derive(entry["movies"], entry["derived"], {}, builders)
+        with _cache_lock:
+            for name, value in derived.items():
+                entry["derived"].setdefault(name, value)
+
+    with _cache_lock:
+        return CatalogVersion(
+            version=entry["digest"], movies=entry["movies"],
+            quarantine=entry["quarantine"], derived=dict(entry["derived"])
+        )
+
+
+def load_quarantine(path):
+    """
+    Malformed rows found while parsing `path` (Line, Fields, Repaired,
+    Raw), cached alongside the catalog.
+    """
+    return _current_entry(path)["quarantine"]
+
+
+def catalog_version(path):
+    """Content digest of the catalog currently cached for `path`."""
+    return _current_entry(path)["digest"]
+
+
+def invalidate(path=None):
+    """Drop the cached catalog for `path`, or every cached catalog."""
+    with _cache_lock:
+        if path is None:
+            _cache.clear()
+        else:
+            _cache.pop(os.path.abspath(path), None)
+
+
+# =================================================
+# STREAMING INGESTION (CATALOGS LARGER THAN RAM)
+# =================================================
+def iter_movies(path, chunksize=CHUNK_SIZE):
+    """
+    Yield the cleaned catalog in chunks of at most `chunksize` rows.
+
+    If the strict reader hits a malformed row, reading continues from
+    that chunk with the tolerant reader; repaired rows are kept and
+    unrepairable ones skipped.
+    """
+    plan = compile_plan(path)
+    done = 0
+    try:
+        for chunk in read_fast(path, plan, chunksize):
+            done += len(chunk)
+            yield clean_movies(chunk, plan)
+    except ValueError:
+        for rows, _ in iter_tolerant(path, plan, chunksize, skip_rows=done):
+            yield clean_movies(rows, plan)
+
+
+def summarize_movies(path, chunksize=CHUNK_SIZE, top_k=10, min_rating=None):
+    """
+    Rating stats, genre counts and top-K movies in one streaming pass.
+
+    Each chunk is cleaned, optionally filtered to BaseRating >=
+    min_rating, and folded into running aggregates, so peak memory is
+    bounded by the chunk size rather than the file size.
+    """
+    count = 0
+    total = 0.0
+    total_sq = 0.0
+    low = float("inf")
+    high = float("-inf")
+    genre_counts = pd.Series(dtype="int64")
+    top = None
+
+    for chunk in iter_movies(path, chunksize):
+        if min_rating is not None:
+            chunk = chunk[chunk["BaseRating"] >= min_rating]
+        if chunk.empty:
+            continue
+
+        ratings = chunk["BaseRating"].to_numpy(dtype="float64")
+        count += len(ratings)
+        total += float(ratings.sum())
+        total_sq += float((ratings ** 2).sum())
+        low = min(low, float(ratings.min()))
+        high = max(high, float(ratings.max()))
+
+        genres = chunk["Genre"].str.strip().str.split(GENRE_SEPARATOR)
+        chunk_counts = genres.explode().value_counts()
+        genre_counts = genre_counts.add(chunk_counts, fill_value=0)
+
+        candidates = chunk.nlargest(top_k, "BaseRating")[MOVIE_COLUMNS]
+        if top is not None:
+            candidates = pd.concat([top, candidates], ignore_index=True)
+        top = candidates.nlargest(top_k, "BaseRating")
+
+    mean = total / count if count else float("nan")
+    variance = total_sq / count - mean ** 2 if count else float("nan")
+
+    return {
+        "count": count,
+        "mean_rating": mean,
+        "std_rating": max(variance, 0.0) ** 0.5 if count else float("nan"),
+        "min_rating": low if count else float("nan"),
+        "max_rating": high if count else float("nan"),
+        "genre_counts": (
+            genre_counts.astype("int64").sort_values(ascending=False)
+        ),
+        "top_movies": (
+            top.reset_index(drop=True) if top is not None
+            else pd.DataFrame(columns=MOVIE_COLUMNS)
+        )
+    }
+
+
+if __name__ == "__main__":
+    # Build (or refresh) snapshots for the CSV files given on the
+    # command line, e.g. `python catalog.py asta.csv asta1.csv`
+    for csv_path in sys.argv[1:] or ["asta.csv"]:
+        csv_digest = content_hash(csv_path)
+        built, _ = build_snapshot(csv_path, csv_digest)
+        print(f"{csv_path}: {len(built)} rows -> "
+              f"{snapshot_path(csv_path, csv_digest)}")
@@ -0,0 +1,154 @@
+"""
+Memory-mapped NumPy column store for the numeric catalog columns.
+
+Each numeric column of a catalog (BaseRating, Year, Watchtime,
+Metascore, Votes, Gross) is written once as a fixed-width .npy file
+under .snapshots/<name>.v<format>.<digest>_columns/ and then mapped
+read-only with
+np.load(mmap_mode="r"). Every caller in a process shares the same
+mapping, and separate processes that call load_columns() map the same
+files, so the operating system keeps a single physical copy.
+
+This is a library for batch jobs and tools: the Streamlit apps and the
+simulate.py shard workers do not use it. The apps share the pandas
+frame of load_movies() instead, and the workers need only the movie x
+genre matrix, not these columns. The store is keyed on the CSV's
+current content digest, not on the catalog version load_movies()
+serves for a watched path, so it must not be mixed with that frame
+during a hot reload.
+
+    python column_store.py asta.csv asta1.csv
+"""
+
+import os
+import shutil
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+from catalog import content_hash, file_stat, read_movies, snapshot_stem
+from converters import parse_number
+
+
+# Canonical catalog column -> on-disk dtype
+NUMERIC_COLUMNS = {
+    "BaseRating": np.float32,
+    "Year": np.int32,
+    "Watchtime": np.int32,
+    "Metascore": np.float32,
+    "Votes": np.int32,
+    "Gross": np.float32
+}
+
+# Value stored for missing entries of integer columns
+INT_MISSING = -1
+
+# Mapped stores, keyed by absolute CSV path
+# Each entry holds the file stat, content digest and the mapped columns
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+# =================================================
+# BUILD
+# =================================================
+def store_dir(path, digest=None):
+    """Folder holding the .npy column files for a catalog CSV."""
+    return snapshot_stem(path, digest) + "_columns"
+
+
+def _fixed_width(values, dtype):
+    """Convert a float column to the on-disk dtype."""
+    if np.issubdtype(dtype, np.integer):
+        values = values.fillna(INT_MISSING)
+    return values.to_numpy(dtype=dtype)
+
+
+def build_column_store(path, digest=None):
+    """
+    Write every available numeric column of a catalog as a .npy file,
+    for the content `digest` (default: the CSV's current one), and
+    drop the stores of other contents.
+    """
+    if digest is None:
+        digest = content_hash(path)
+    movies = read_movies(path, digest)
+    folder = store_dir(path, digest)
+    os.makedirs(folder, exist_ok=True)
+
+    for name, dtype in NUMERIC_COLUMNS.items():
+        if name not in movies.columns:
+            continue
+
+        array = _fixed_width(parse_number(movies[name]), dtype)
+        target = os.path.join(folder, name + ".npy")
+        tmp = f"{target}.{os.getpid()}.tmp.npy"
+        np.save(tmp, array)
+        os.replace(tmp, target)
+
+    # Stores of other formats and contents are never mapped again
+    parent, current = os.path.split(folder)
+    stem = current.split(".v", 1)[0]
+    for name in os.listdir(parent):
+        if name.startswith(f"{stem}.v") and name.endswith("_columns") \
+                and name != current:
+            shutil.rmtree(os.path.join(parent, name), ignore_errors=True)
+
+    return folder
+
+
+def store_is_fresh(path, digest=None):
+    """True when column files exist for the CSV's content digest."""
+    folder = store_dir(path, digest)
+    return os.path.isdir(folder) and any(
+        f.endswith(".npy") and ".tmp" not in f for f in os.listdir(folder)
+    )
+
+
+# =================================================
+# MAP
+# =================================================
+def load_columns(path):
+    """
+    Return {column name: read-only memory-mapped array} for a catalog.
+
+    Arrays are row-aligned with read_movies(path). The store is
+    rebuilt when the CSV's content digest has no column files yet.
+    The mapping is made once per process and shared by every caller.
+    """
+    key = os.path.abspath(path)
+    stat = file_stat(path)
+
+    with _stores_lock:
+        entry = _stores.get(key)
+        if entry is not None and entry["stat"] == stat:
+            return entry["columns"]
+
+        digest = content_hash(path)
+        if entry is not None and entry["digest"] == digest:
+            entry["stat"] = stat
+            return entry["columns"]
+
+        if not store_is_fresh(path, digest):
+            build_column_store(path, digest)
+
+        folder = store_dir(path, digest)
+        columns = {
+            f[:-len(".npy")]: np.load(os.path.join(folder, f), mmap_mode="r")
+            for f in sorted(os.listdir(folder))
+            if f.endswith(".npy") and ".tmp" not in f
+        }
+        _stores[key] = {"stat": stat, "digest": digest, "columns": columns}
+        return columns
+
+
+def columns_frame(path):
+    """DataFrame view over the mapped columns (no data is copied)."""
+    return pd.DataFrame(load_columns(path), copy=False)
+
+
+if __name__ == "__main__":
+    for csv_path in sys.argv[1:] or ["asta.csv"]:
+        print(f"{csv_path}: {build_column_store(csv_path)}")
@@ -0,0 +1,284 @@
+"""
+Persistent, append-only log of user-movie interaction events.
+
+The apps used to regenerate their UserID/MovieID/UserRating/WatchTime/
+WatchDate table on every Streamlit rerun and throw it away. An event
+log keeps that history on disk (.events/<name>-<key>/) so later runs
+only read it back, and lays it out so a view reads only what it needs:
+
+    <log>/month=2024-03/bucket=05/part-<time>-<pid>.feather
+
+Rows are partitioned by WatchDate month and by a stable hash bucket of
+UserID. append_events() only ever adds new part files, each written
+under a temporary name and renamed into place. ensure_log() builds a
+whole log in a private folder and renames it into place, so readers
+and concurrent builders only ever see a missing or a complete log.
+load_events() prunes by month and user before touching any data (one
+user's history reads one bucket per month), and month_counts() answers
+the monthly trend from part metadata without reading the rows.
+"""
+
+import glob
+import hashlib
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+
+# Folder (next to the CSV) that holds the event logs
+EVENT_DIR = ".events"
+
+# Columns of an event; movie attributes are joined back from the catalog
+EVENT_COLUMNS = ["UserID", "MovieID", "UserRating", "WatchTime", "WatchDate"]
+
+# Hash buckets per month partition
+USER_BUCKETS = 16
+
+# Marker written once a log holds its complete history
+COMPLETE_MARKER = "_COMPLETE"
+
+# Build folders older than this (seconds) are left over from a crash
+STALE_BUILD = 3600
+
+# Feather needs pyarrow; without it parts are pickled frames
+try:
+    import pyarrow.feather as feather
+    PART_SUFFIX = ".feather"
+except ImportError:
+    feather = None
+    PART_SUFFIX = ".pkl"
+
+
+def log_path(catalog_path, name, key):
+    """
+    Directory of the event log `name` generated under `key` (any
+    repr-able value, e.g. the catalog version and generator options).
+    """
+    digest = hashlib.blake2b(repr(key).encode(), digest_size=8).hexdigest()
+    folder = os.path.dirname(os.path.abspath(catalog_path))
+    return os.path.join(folder, EVENT_DIR, f"{name}-{digest}")
+
+
+def user_bucket(user_ids):
+    """Stable bucket (0..USER_BUCKETS-1) of every UserID."""
+    hashes = pd.util.hash_array(np.asarray(user_ids, dtype=object))
+    return (hashes % USER_BUCKETS).astype(np.int64)
+
+
+def _partition(log, month, bucket):
+    return os.path.join(log, f"month={month}", f"bucket={bucket:02d}")
+
+
+def _write_part(frame, folder):
+    os.makedirs(folder, exist_ok=True)
+    target = os.path.join(
+        folder, f"part-{time.time_ns()}-{os.getpid()}{PART_SUFFIX}"
+    )
+    tmp = f"{target}.tmp"
+    if feather is not None:
+        frame.to_feather(tmp)
+    else:
+        frame.to_pickle(tmp)
+    os.replace(tmp, target)
+    return target
+
+
+def append_events(events, log):
+    """
+    Append interaction events (a frame with EVENT_COLUMNS, plus any
+    extra columns to keep after them) to `log`.
+
+    Every (month, user bucket) group becomes one new part file; nothing
+    already in the log is rewritten. Returns the written paths.
+    """
+    extra = [c for c in events.columns if c not in EVENT_COLUMNS]
+    events = events[EVENT_COLUMNS + extra]
+    months = events["WatchDate"].dt.strftime("%Y-%m").to_numpy()
+    buckets = user_bucket(events["UserID"])
+
+    paths = []
+    keys = pd.DataFrame({"month": months, "bucket": buckets})
+    groups = keys.groupby(["month", "bucket"]).indices
+    for (month, bucket), rows in groups.items():
+        part = events.iloc[np.sort(rows)].reset_index(drop=True)
+        paths.append(_write_part(part, _partition(log, month, bucket)))
+    return paths
+
+
+def is_complete(log):
+    """True once mark_complete() recorded the log's full history."""
+    return os.path.exists(os.path.join(log, COMPLETE_MARKER))
+
+
+def mark_complete(log):
+    """Record that `log` now holds its complete history."""
+    os.makedirs(log, exist_ok=True)
+    open(os.path.join(log, COMPLETE_MARKER), "w").close()
+
+
+def _remove_other_logs(log):
+    """Delete the logs generated under another key for the same name."""
+    folder, current = os.path.split(log)
+    name = current.rsplit("-", 1)[0]
+    for path in glob.glob(os.path.join(folder, f"{name}-*")):
+        other = os.path.basename(path)
+        if other == current or other.rsplit("-", 1)[0] != name:
+            continue
+        # Moved aside first, so no reader sees a half-deleted log
+        aside = f"{path}.partial-{os.getpid()}-{time.time_ns()}"
+        try:
+            os.replace(path, aside)
+        except OSError:
+            continue
+        shutil.rmtree(aside, ignore_errors=True)
+
+
+def _remove_stale_builds(log):
+    """Delete build folders of `log` abandoned by a crashed process."""
+    cutoff = time.time() - STALE_BUILD
+    for path in glob.glob(f"{log}.build-*"):
+        try:
+            if os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            pass
+
+
+def ensure_log(log, build):
+    """
+    Return `log`, filling it first with build() (a frame of events)
+    when it does not hold a complete history yet.
+
+    The events are written to a private build folder, marked complete
+    and renamed to `log` in one step. A complete log is final: when
+    another process got there first, its log is kept and this build is
+    thrown away. A crash leaves only a build folder, removed by a later
+    call once it is STALE_BUILD seconds old. Once a new log is in
+    place, the logs of the same name generated under other keys (e.g.
+    older catalog versions) are deleted.
+    """
+    if is_complete(log):
+        return log
+
+    _remove_stale_builds(log)
+    tmp = f"{log}.build-{os.getpid()}-{time.time_ns()}"
+    try:
+        append_events(build(), tmp)
+        mark_complete(tmp)
+        if os.path.isdir(log) and not is_complete(log):
+            # Partial log written before builds were atomic: move it
+            # aside first so nobody deletes files from a complete one
+            partial = f"{log}.partial-{os.getpid()}-{time.time_ns()}"
+            try:
+                os.replace(log, partial)
+            except OSError:
+                pass
+            shutil.rmtree(partial, ignore_errors=True)
+        try:
+            os.replace(tmp, log)
+        except OSError:
+            if not is_complete(log):
+                raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    _remove_other_logs(log)
+    return log
+
+
+def list_months(log):
+    """Months ("YYYY-MM") the log has events for, in order."""
+    return sorted(
+        os.path.basename(path).split("=", 1)[1]
+        for path in glob.glob(os.path.join(log, "month=*"))
+    )
+
+
+def _parts(log, months=None, users=None):
+    """Part files of the selected months and of the users' buckets."""
+    months = list_months(log) if months is None else months
+    buckets = range(USER_BUCKETS) if users is None \
+        else sorted(set(user_bucket(users).tolist()))
+    return [
+        path
+        for month in months
+        for bucket in buckets
+        for path in sorted(glob.glob(
+            os.path.join(_partition(log, month, bucket), f"*{PART_SUFFIX}")
+        ))
+    ]
+
+
+def _read_part(path, columns):
+    if feather is not None:
+        return pd.read_feather(path, columns=columns)
+    frame = pd.read_pickle(path)
+    return frame if columns is None else frame[columns]
+
+
+def load_events(log, months=None, users=None, columns=None, movies=None):
+    """
+    Events of the selected `months` ("YYYY-MM", default all), `users`
+    and `movies` (MovieIDs; default all), reading only their
+    partitions and, with `columns`, only those columns.
+    """
+    if users is not None and columns is not None \
+            and "UserID" not in columns:
+        columns = ["UserID"] + list(columns)
+    if movies is not None and columns is not None \
+            and "MovieID" not in columns:
+        columns = ["MovieID"] + list(columns)
+
+    paths = _parts(log, months, users)
+    frames = [_read_part(path, columns) for path in paths]
+    if not frames:
+        return pd.DataFrame(columns=columns or EVENT_COLUMNS)
+    events = pd.concat(frames, ignore_index=True)
+
+    if users is not None:
+        events = events[events["UserID"].isin(list(users))]
+    if movies is not None:
+        events = events[events["MovieID"].isin(list(movies))]
+    return events.reset_index(drop=True)
+
+
+def _row_count(path):
+    if feather is not None:
+        return feather.read_table(path, columns=[], memory_map=True).num_rows
+    return len(pd.read_pickle(path))
+
+
+def month_counts(log):
+    """Number of events per month, from part metadata only."""
+    counts = {
+        month: sum(_row_count(path) for path in _parts(log, [month]))
+        for month in list_months(log)
+    }
+    return pd.Series(counts, name="Views", dtype="int64").rename_axis("Month")
+
+
+def first_per_user(events, count, order="Order"):
+    """
+    Each user's first `count` events by the `order` column (fewer when
+    the user has fewer), grouped by user.
+    """
+    ordered = events.sort_values(["UserID", order], kind="stable")
+    return ordered.groupby("UserID").head(count).reset_index(drop=True)
+
+
+def attach_movies(events, movies, columns=("MovieName", "Genre")):
+    """
+    Join catalog columns onto events by MovieID (events order kept).
+
+    Categorical columns keep only the categories the events use.
+    """
+    lookup = movies.set_index("MovieID")[list(columns)]
+    joined = lookup.reindex(events["MovieID"].to_numpy())
+    for column in columns:
+        values = joined[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.cat.remove_unused_categories()
+        events[column] = values.array
+    return events
@@ -0,0 +1,451 @@
+"""
+Genre -> movie index and alias-method samplers.
+
+Picking the movies a simulated user watches used to scan the Genre
+text of the whole catalog for every user on every rerun
+(str.contains("Drama|Comedy", case=False)) and then call .sample() on
+the filtered frame. build_genre_index() splits each distinct Genre
+string once (the column is categorical) and stores, for every genre,
+the row positions of its movies in CSR form:
+
+    offsets[g]:offsets[g + 1]  -> slice of movie_rows
+
+Each movie's genre set is also encoded once as a uint64 bitmask over
+the vocabulary (bit g = genres[g]), so any genre filter is a single
+vectorized bitwise test (GenreIndex.any_of / all_of) instead of a
+case-insensitive regex scan, and "Music" no longer matches "Musical".
+
+The same pairs are kept row-major too (row_offsets / row_genres: the
+sparse movie x genre matrix). An interaction table is that matrix
+with rows repeated, so genre views and per-user genre counts are
+sparse products computed with np.bincount (genre_views,
+user_genre_views) instead of DataFrame.explode("GenreList"), which
+copies every column once per genre.
+
+Genre strings are canonical from ingest on (schemas.canonical_genres:
+stripped, title-cased, ", " separated), so genre_lists() can turn a
+categorical Genre column into GenreList by splitting each category
+once: rows keep their integer codes and share interned name tuples.
+
+GenreCooccurrence counts, from the same bitmasks, how many movies have
+each pair of genres, and derives lift = P(a, b) / (P(a) P(b)).
+related() expands a seed genre to its most associated genres with one
+scan of a row (O(genres)). The index and the counts are built with
+every catalog version, before it becomes visible (see
+catalog.register_derived), so a watcher's reload builds them off the
+request path; when a new version only appends movies, the new rows
+are added to the previous counts instead of recounting.
+
+A set of genres is a union of CSR slices, and GenreIndex.sampler()
+turns it into an AliasSampler (Vose's alias method): after an O(n)
+build, cached per genre set, every weighted draw is O(1), one uniform
+integer and one uniform float, with no string work at all.
+"""
+
+import sys
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from catalog import load_catalog, register_derived
+
+
+# Genres a bitmask can hold
+MAX_GENRES = 64
+
+# Separator between genres in a canonical Genre string
+CANONICAL_SEPARATOR = ", "
+
+# Related genres: a genre must be over-represented next to the seed
+# (lift above MIN_LIFT) in at least MIN_PAIR_MOVIES movies
+MIN_LIFT = 1.0
+MIN_PAIR_MOVIES = 5
+
+# Names of the structures built with every catalog version
+# (catalog.register_derived)
+GENRE_INDEX = "genre_index"
+GENRE_COOCCURRENCE = "genre_cooccurrence"
+
+
+def build_alias(weights):
+    """
+    Vose's alias tables for a non-negative weight vector.
+
+    Returns (prob, alias): draw a slot i uniformly, keep it with
+    probability prob[i], otherwise take alias[i].
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    n = len(weights)
+    scaled = weights * (n / weights.sum())
+    prob = np.ones(n)
+    alias = np.arange(n)
+
+    small = list(np.flatnonzero(scaled < 1.0))
+    large = list(np.flatnonzero(scaled >= 1.0))
+    while small and large:
+        less, more = small.pop(), large.pop()
+        prob[less] = scaled[less]
+        alias[less] = more
+        scaled[more] -= 1.0 - scaled[less]
+        (small if scaled[more] < 1.0 else large).append(more)
+    # Leftovers are 1 up to rounding
+    return prob, alias
+
+
+@dataclass
+class AliasSampler:
+    """Weighted sampler over a fixed set of movie rows."""
+
+    rows: np.ndarray        # movie row positions that can be drawn
+    weights: np.ndarray     # weight of each of them
+    prob: np.ndarray
+    alias: np.ndarray
+
+    @classmethod
+    def from_weights(cls, rows, weights):
+        prob, alias = build_alias(weights)
+        return cls(np.asarray(rows), np.asarray(weights), prob, alias)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _positions(self, rng, shape):
+        slots = rng.integers(0, len(self.rows), shape)
+        keep = rng.random(shape) < self.prob[slots]
+        return np.where(keep, slots, self.alias[slots])
+
+    def draw(self, rng, size):
+        """`size` movie rows drawn with replacement."""
+        return self.rows[self._positions(rng, size)]
+
+    def sample(self, rng, users, k):
+        """
+        `k` movie rows for each of `users` users (a users x k array),
+        distinct per user unless k exceeds the number of rows.
+        """
+        size = len(self.rows)
+        if k > size:
+            return self.draw(rng, (users, k))
+
+        if 4 * k <= size:
+            # Alias draws, redrawing the repeats of the users that had one
+            draws = self._positions(rng, (users, k))
+            pending = np.arange(users)
+            while len(pending):
+                part = draws[pending]
+                order = np.argsort(part, axis=1)
+                ordered = np.take_along_axis(part, order, axis=1)
+                repeated = ordered[:, 1:] == ordered[:, :-1]
+                rows, cols = np.nonzero(repeated)
+                part[rows, order[rows, cols + 1]] = self._positions(
+                    rng, len(rows)
+                )
+                draws[pending] = part
+                pending = pending[repeated.any(axis=1)]
+            return self.rows[draws]
+
+        # Most rows are needed: exponential race over all of them
+        arrival = rng.standard_exponential((users, size)) / self.weights
+        return self.rows[np.argpartition(arrival, k - 1, axis=1)[:, :k]]
+
+
+@dataclass
+class GenreIndex:
+    """Genre vocabulary plus genre -> movie row CSR arrays."""
+
+    genres: pd.Index            # genre id -> genre name
+    offsets: np.ndarray         # len(genres) + 1
+    movie_rows: np.ndarray      # movie rows, grouped by genre id
+    num_movies: int
+    masks: np.ndarray           # uint64 genre bitmask of every movie row
+    row_offsets: np.ndarray     # num_movies + 1
+    row_genres: np.ndarray      # genre ids, grouped by movie row
+    _samplers: dict = field(default_factory=dict, repr=False)
+
+    def genre_ids(self, names):
+        """Ids of the known genres among `names` (case-insensitive)."""
+        ids = self.genres.str.lower().get_indexer(
+            [name.strip().lower() for name in names]
+        )
+        return ids[ids >= 0]
+
+    def bits(self, names):
+        """Bitmask of the known genres among `names`."""
+        ids = self.genre_ids(names).astype(np.uint64)
+        return np.bitwise_or.reduce(np.uint64(1) << ids, initial=np.uint64(0))
+
+    def any_of(self, names, limit=None):
+        """
+        Boolean mask of the movies having any of the genres, for the
+        first `limit` rows of the catalog (all rows by default).
+        """
+        return (self.masks[:limit] & self.bits(names)) != 0
+
+    def all_of(self, names, limit=None):
+        """Boolean mask of the movies having every one of the genres."""
+        bits = self.bits(names)
+        return (self.masks[:limit] & bits) == bits
+
+    def rows_of(self, genre):
+        """Movie rows of one genre id."""
+        return self.movie_rows[self.offsets[genre]:self.offsets[genre + 1]]
+
+    def rows_for(self, names, limit=None):
+        """
+        Sorted rows of the movies having any of the genres, optionally
+        only among the first `limit` rows of the catalog.
+        """
+        return np.flatnonzero(self.any_of(names, limit))
+
+    def genre_views(self, rows):
+        """
+        Views per genre of the interactions on movie `rows`: the column
+        sums of the interaction x genre matrix, as a Series by genre.
+        """
+        views = np.bincount(rows, minlength=self.num_movies)
+        counts = np.bincount(
+            self.row_genres,
+            weights=np.repeat(views, np.diff(self.row_offsets)),
+            minlength=len(self.genres)
+        )
+        return pd.Series(counts.astype(np.int64), index=self.genres,
+                         name="Views")
+
+    def user_genre_views(self, rows, users):
+        """
+        Views per user and genre of the interactions on movie `rows`
+        by `users`: a users x genres frame (users sorted), i.e. the
+        user x interaction indicator times the interaction x genre one.
+        """
+        codes, labels = pd.factorize(np.asarray(users), sort=True)
+        return pd.DataFrame(
+            self.grouped_genre_views(rows, codes, len(labels)),
+            index=pd.Index(labels, name="UserID"), columns=self.genres
+        )
+
+    def grouped_genre_views(self, rows, groups, num_groups):
+        """
+        num_groups x genres view counts of the interactions on movie
+        `rows`, grouped by integer `groups` codes (0..num_groups-1).
+        """
+        width = len(self.genres)
+        starts = self.row_offsets[rows]
+        lengths = self.row_offsets[np.asarray(rows) + 1] - starts
+
+        # One bincount per genre slot: first genre of every movie,
+        # then the second of those having one, and so on
+        counts = np.zeros(num_groups * width, dtype=np.int64)
+        for slot in range(lengths.max(initial=0)):
+            has = np.flatnonzero(lengths > slot)
+            cells = groups[has] * width + self.row_genres[starts[has] + slot]
+            counts += np.bincount(cells, minlength=len(counts))
+        return counts.reshape(num_groups, width)
+
+    def sampler(self, preferences, limit=None):
+        """
+        AliasSampler for a genre list (equal weights) or a mapping of
+        genre -> weight: a movie's weight is the summed weight of its
+        genres. Cached per genre set, weights and `limit`.
+        """
+        if not isinstance(preferences, dict):
+            preferences = {name: 1.0 for name in preferences}
+        key = (tuple(sorted(
+            (name.lower(), float(w)) for name, w in preferences.items()
+        )), limit)
+        cached = self._samplers.get(key)
+        if cached is not None:
+            return cached
+
+        weights = np.zeros(self.num_movies)
+        for name, weight in preferences.items():
+            for genre in self.genre_ids([name]):
+                weights[self.rows_of(genre)] += weight
+        if limit is not None:
+            weights[limit:] = 0.0
+        rows = np.flatnonzero(weights > 0)
+        sampler = AliasSampler.from_weights(rows, weights[rows])
+        self._samplers[key] = sampler
+        return sampler
+
+
+def _pair_counts(masks, width):
+    """genres x genres movie counts of a block of genre bitmasks."""
+    bits = (masks[:, None] >> np.arange(width, dtype=np.uint64)) & 1
+    bits = bits.astype(np.int64)
+    return bits.T @ bits
+
+
+@dataclass
+class GenreCooccurrence:
+    """Movies per genre pair (diagonal: per genre) and their lift."""
+
+    genres: pd.Index
+    counts: np.ndarray          # genres x genres, symmetric
+    num_movies: int
+
+    @classmethod
+    def from_index(cls, index):
+        return cls(
+            index.genres, _pair_counts(index.masks, len(index.genres)),
+            index.num_movies
+        )
+
+    def added(self, masks):
+        """Counts with the movies of `masks` (same vocabulary) added."""
+        return GenreCooccurrence(
+            self.genres,
+            self.counts + _pair_counts(masks, len(self.genres)),
+            self.num_movies + len(masks)
+        )
+
+    def lift(self):
+        """genres x genres lift; 0 where a genre has no movies."""
+        sizes = np.diag(self.counts).astype(np.float64)
+        expected = np.outer(sizes, sizes) / max(self.num_movies, 1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            lift = self.counts / expected
+        return np.nan_to_num(lift, nan=0.0, posinf=0.0)
+
+    def related(self, genre, limit=3, min_lift=MIN_LIFT,
+                min_movies=MIN_PAIR_MOVIES):
+        """
+        Up to `limit` genres most associated with `genre` (by lift),
+        strongest first; empty for an unknown genre.
+        """
+        ids = self.genres.str.lower().get_indexer([genre.strip().lower()])
+        seed = ids[0]
+        if seed < 0:
+            return []
+
+        pair = self.counts[seed].astype(np.float64)
+        sizes = np.diag(self.counts)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            lift = pair * self.num_movies / (sizes[seed] * sizes)
+        keep = (pair >= min_movies) & (lift > min_lift)
+        keep[seed] = False
+
+        candidates = np.flatnonzero(keep)
+        order = np.argsort(-lift[candidates], kind="stable")[:limit]
+        return self.genres[candidates[order]].tolist()
+
+
+def build_genre_index(genre_column):
+    """Build a GenreIndex from a (categorical) Genre column."""
+    genre = genre_column.astype("category")
+    # Split each distinct Genre string once, then expand by row code
+    parts = genre.cat.categories.to_series().str.split(",").explode()
+    parts = parts.str.strip()
+    parts = parts[parts.notna() & (parts != "")]
+
+    genres = pd.Index(parts.unique(), name="Genre").sort_values()
+    if len(genres) > MAX_GENRES:
+        raise ValueError(
+            f"{len(genres)} genres do not fit a {MAX_GENRES}-bit mask"
+        )
+    category_genres = pd.DataFrame({
+        "category": genre.cat.categories.get_indexer(parts.index),
+        "genre": genres.get_indexer(parts.to_numpy())
+    }).drop_duplicates()
+
+    codes = genre.cat.codes.to_numpy()
+    # rows of every category, grouped by category code (CSR)
+    order = np.argsort(codes, kind="stable")
+    counts = np.bincount(codes[codes >= 0],
+                         minlength=len(genre.cat.categories))
+    starts = np.concatenate([[0], np.cumsum(counts)]) + (codes < 0).sum()
+
+    pair_category = category_genres["category"].to_numpy()
+    pair_genre = category_genres["genre"].to_numpy()
+    lengths = counts[pair_category]
+    positions = np.repeat(starts[pair_category] - np.cumsum(lengths) +
+                          lengths, lengths) + np.arange(lengths.sum())
+    row_genre = np.repeat(pair_genre, lengths)
+    rows = order[positions]
+
+    # Bitmask per Genre category, then per row through its code
+    category_masks = np.zeros(len(genre.cat.categories), dtype=np.uint64)
+    np.bitwise_or.at(
+        category_masks, pair_category,
+        np.uint64(1) << pair_genre.astype(np.uint64)
+    )
+    masks = np.where(codes >= 0, category_masks[codes], np.uint64(0))
+
+    by_genre = np.lexsort((rows, row_genre))
+    genre_counts = np.bincount(row_genre, minlength=len(genres))
+    by_row = np.lexsort((row_genre, rows))
+    row_counts = np.bincount(rows, minlength=len(genre))
+    return GenreIndex(
+        genres=genres,
+        offsets=np.concatenate([[0], np.cumsum(genre_counts)]),
+        movie_rows=rows[by_genre],
+        num_movies=len(genre),
+        masks=masks,
+        row_offsets=np.concatenate([[0], np.cumsum(row_counts)]),
+        row_genres=row_genre[by_row]
+    )
+
+
+def genre_lists(genre_column):
+    """
+    GenreList of a Genre column: a categorical with the same codes,
+    whose categories are tuples of (interned) genre names.
+    """
+    genre = genre_column.astype("category")
+    lists = np.empty(len(genre.cat.categories), dtype=object)
+    lists[:] = [
+        tuple(sys.intern(name) for name in label.split(CANONICAL_SEPARATOR))
+        for label in genre.cat.categories
+    ]
+    return pd.Series(
+        pd.Categorical.from_codes(
+            genre.cat.codes, pd.Index(lists, tupleize_cols=False)
+        ),
+        index=genre_column.index, name="GenreList"
+    )
+
+
+def _derive_index(movies, derived, previous):
+    return build_genre_index(movies["Genre"])
+
+
+def _derive_cooccurrence(movies, derived, previous):
+    """
+    Co-occurrence counts of a new version. When it keeps the previous
+    rows and vocabulary and only appends movies, just the appended
+    rows are counted.
+    """
+    index = derived[GENRE_INDEX]
+    before = previous.get(GENRE_INDEX)
+    counts = previous.get(GENRE_COOCCURRENCE)
+    if before is None or counts is None:
+        return GenreCooccurrence.from_index(index)
+
+    appended = (
+        before.genres.equals(index.genres)
+        and before.num_movies <= index.num_movies
+        and np.array_equal(before.masks, index.masks[:before.num_movies])
+    )
+    if appended:
+        return counts.added(index.masks[before.num_movies:])
+    return GenreCooccurrence.from_index(index)
+
+
+# Built with every catalog version, before it becomes visible
+register_derived(GENRE_INDEX, _derive_index)
+register_derived(GENRE_COOCCURRENCE, _derive_cooccurrence)
+
+
+def load_genre_index(path):
+    """
+    GenreIndex of the catalog version load_catalog() currently serves.
+
+    Apps that also use the frame should take both from one
+    load_catalog() call (derived[GENRE_INDEX]) instead.
+    """
+    return load_catalog(path).derived[GENRE_INDEX]
+
+
+def load_genre_cooccurrence(path):
+    """GenreCooccurrence of the catalog version currently served."""
+    return load_catalog(path).derived[GENRE_COOCCURRENCE]
@@ -0,0 +1,204 @@
+"""
+Deduplicated merge of the two movie catalogs into one indexed table.
+
+asta.csv and asta1.csv describe many of the same titles with different
+attributes (Metascore, Watchtime and PG_Rating on one side; Budget and
+Language on the other). merge_catalogs() normalizes title + year into
+a join key, drops duplicates inside each source, hash-joins the two on
+that key and resolves the overlapping columns by RESOLUTION.
+
+load_merged() runs the merge once per pair of catalog versions and
+keeps the result, plus its key index, in .snapshots/ and in memory.
+
+    python merge.py asta.csv asta1.csv
+"""
+
+import hashlib
+import os
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+from catalog import (
+    SNAPSHOT_DIR, SNAPSHOT_FORMAT, catalog_version, load_movies
+)
+
+
+# How each column present in both catalogs is resolved
+#   primary  -> value from the first catalog, else the second
+#   max      -> larger of the two values
+RESOLUTION = {
+    "MovieName": "primary",
+    "Genre": "primary",
+    "BaseRating": "primary",
+    "Year": "primary",
+    "Votes": "max",
+    "Gross": "primary"
+}
+
+# Layout version of the merged frame, part of its snapshot key; bump
+# it whenever merge_catalogs() output changes
+MERGE_FORMAT = 2
+
+# Combining diacritical marks left behind by NFKD normalization
+ACCENTS = "[\u0300-\u036f]"
+
+# Merged tables, keyed by the combined source versions
+_merged = {}
+_merged_lock = threading.Lock()
+
+
+def join_key(movies):
+    """
+    Normalized "title|year" key: accents, case, punctuation and
+    repeated whitespace do not affect it.
+    """
+    title = (
+        movies["MovieName"].astype("string")
+        .str.normalize("NFKD")
+        .str.replace(ACCENTS, "", regex=True)
+        .str.casefold()
+        .str.replace(r"[^\w\s]", "", regex=True)
+        .str.replace(r"\s+", " ", regex=True)
+        .str.strip()
+    )
+    year = movies["Year"].astype("Int32").astype("string").fillna("")
+    return (title + "|" + year).rename("Key")
+
+
+def _dedupe(movies, source):
+    """
+    One row per join key, keeping the most-voted row, with the source
+    MovieID kept as <source>ID.
+    """
+    movies = movies.assign(Key=join_key(movies))
+    if "Votes" in movies.columns:
+        movies = movies.sort_values("Votes", ascending=False, kind="stable")
+    movies = movies.drop_duplicates("Key").sort_index()
+    return movies.rename(columns={"MovieID": f"{source}ID"}).set_index("Key")
+
+
+def _resolve(left, right, rule, integer=False):
+    """
+    Resolve one shared column. `integer` tells whether the sources
+    held integers: the outer join has turned them into floats.
+    """
+    if rule == "max":
+        larger = np.fmax(left.astype("float64"), right.astype("float64"))
+        if integer:
+            larger = larger.round().astype("Int64")
+        return larger
+    if isinstance(left.dtype, pd.CategoricalDtype):
+        left, right = left.astype("string"), right.astype("string")
+    return left.where(left.notna(), right)
+
+
+def merge_catalogs(primary, secondary, names=("Primary", "Secondary")):
+    """
+    Full outer hash join of two cleaned catalogs on the title/year key.
+
+    Returns a frame with a fresh MovieID, the source IDs, the resolved
+    shared columns and every column only one side has.
+    """
+    left = _dedupe(primary, names[0])
+    right = _dedupe(secondary, names[1])
+    joined = left.join(right, how="outer", lsuffix="_l", rsuffix="_r",
+                       sort=False)
+
+    shared = [c for c in left.columns if c in right.columns]
+    for column in shared:
+        rule = RESOLUTION.get(column, "primary")
+        integer = any(
+            pd.api.types.is_integer_dtype(side[column].dtype)
+            for side in (left, right)
+        )
+        joined[column] = _resolve(
+            joined.pop(f"{column}_l"), joined.pop(f"{column}_r"), rule,
+            integer
+        )
+
+    if "Genre" in joined.columns:
+        joined["Genre"] = joined["Genre"].astype("category")
+
+    id_columns = [f"{names[0]}ID", f"{names[1]}ID"]
+    joined[id_columns] = joined[id_columns].astype("Int32")
+    leading = ["MovieName", "Genre", "BaseRating"] + id_columns
+    rest = [c for c in joined.columns if c not in leading]
+
+    # Rows of the primary catalog first, in its order, then the rest
+    joined = joined.sort_values(id_columns, kind="stable")
+    merged = joined[leading + rest].reset_index()
+    merged.insert(0, "MovieID", np.arange(len(merged), dtype=np.int32))
+    return merged
+
+
+def merged_path(primary_path, version):
+    """Location of the merged snapshot for a combined source version."""
+    folder = os.path.dirname(os.path.abspath(primary_path))
+    return os.path.join(folder, SNAPSHOT_DIR, f"merged_{version}.feather")
+
+
+def _write_merged(merged, target):
+    """Write the merged snapshot and drop snapshots of older versions."""
+    folder = os.path.dirname(target)
+    os.makedirs(folder, exist_ok=True)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    merged.to_feather(tmp)
+    os.replace(tmp, target)
+
+    for name in os.listdir(folder):
+        stale = os.path.join(folder, name)
+        if name.startswith("merged_") and name.endswith(".feather") \
+                and stale != target:
+            os.remove(stale)
+
+
+def load_merged(primary_path="asta.csv", secondary_path="asta1.csv"):
+    """
+    Merged catalog for two catalog files, built once per data version.
+
+    Returns (merged frame, key index mapping join key -> row). The
+    merge is reused from memory, then from .snapshots/, and only
+    recomputed when either source's content changes.
+    """
+    versions = [
+        catalog_version(primary_path), catalog_version(secondary_path),
+        str(SNAPSHOT_FORMAT), str(MERGE_FORMAT)
+    ]
+    version = hashlib.blake2b(
+        "|".join(versions).encode(), digest_size=8
+    ).hexdigest()
+
+    with _merged_lock:
+        if version in _merged:
+            return _merged[version]
+
+        target = merged_path(primary_path, version)
+        try:
+            merged = pd.read_feather(target)
+        except (ImportError, OSError):
+            names = [
+                os.path.splitext(os.path.basename(p))[0].capitalize()
+                for p in (primary_path, secondary_path)
+            ]
+            merged = merge_catalogs(
+                load_movies(primary_path), load_movies(secondary_path), names
+            )
+            try:
+                _write_merged(merged, target)
+            except ImportError:
+                pass
+
+        key_index = pd.Index(merged["Key"], name="Key")
+        # Only the current data version is worth keeping in memory
+        _merged.clear()
+        _merged[version] = (merged, key_index)
+        return _merged[version]
+
+
+if __name__ == "__main__":
+    paths = sys.argv[1:3] if len(sys.argv) > 2 else ["asta.csv", "asta1.csv"]
+    merged, _ = load_merged(*paths)
+    print(f"{len(merged)} movies -> {merged_path(paths[0], '*')}")
@@ -0,0 +1,411 @@
+"""
+Fault-tolerant catalog parsing that stays on the C parser.
+
+A row with unquoted commas has more fields than the header. A strict
+read_csv() either fails on it or, when `usecols` is set, silently
+shifts the row's values into the wrong columns; handling it row by row
+means the slow Python engine (on_bad_lines=callable).
+
+read_fast() is the normal typed C-engine read, with the field count
+of every row checked: a malformed row raises "Expected N fields" (or
+fails a typed column) instead of being shifted. Only then does
+read_tolerant() re-read the file with the C engine under a header
+widened by EXTRA_FIELDS spare columns, so malformed rows simply fill
+the spares. Those rows are then
+split off with array operations, repaired where a vectorized heuristic
+can, and reported in a quarantine side table with their line numbers.
+
+Line numbers assume one record per physical line, which holds for the
+scraped catalogs (no quoted newlines).
+
+The shipped catalogs parse cleanly, so check_repairs() exercises this
+path on a malformed copy of one and compares the result with the
+clean parse:
+
+    python quarantine.py asta.csv
+"""
+
+import csv
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from schemas import compile_plan, read_header
+
+
+# Spare columns added after the header to absorb surplus fields
+EXTRA_FIELDS = 16
+MAX_EXTRA_FIELDS = 256
+
+# Columns of the quarantine side table
+QUARANTINE_COLUMNS = ["Line", "Fields", "Repaired", "Raw"]
+
+# Malformed copies: every EVERY-th data row from row START on is
+# broken, alternating a stray comma in the title (repairable) and a
+# stray field between two numeric columns (not repairable)
+EVERY = 17
+START = 250
+
+
+def empty_quarantine():
+    """Quarantine table with no rows."""
+    return pd.DataFrame({
+        "Line": pd.Series(dtype="int64"),
+        "Fields": pd.Series(dtype="int64"),
+        "Repaired": pd.Series(dtype="bool"),
+        "Raw": pd.Series(dtype="string")
+    })
+
+
+def _is_numeric(dtype):
+    return pd.api.types.is_numeric_dtype(pd.api.types.pandas_dtype(dtype))
+
+
+def _text_positions(header, plan):
+    """
+    Header positions a stray comma may belong to, most likely first:
+    the title column, then every column the plan does not read as a
+    number, in header order.
+    """
+    dtypes = plan["read"].get("dtype", {})
+    title = [raw for raw, name in plan["rename"].items() if name == "MovieName"]
+    text = [c for c in header if not _is_numeric(dtypes.get(c, "string"))]
+    ordered = title + [c for c in text if c not in title]
+    return [header.index(c) for c in ordered]
+
+
+def _numbers(values, thousands):
+    """Numeric view of text fields (NaN where a value is not a number)."""
+    if thousands:
+        values = values.str.replace(thousands, "", regex=False)
+    return pd.to_numeric(values, errors="coerce")
+
+
+def _numbers_valid(frame, plan):
+    """Rows whose declared numeric columns hold numbers (or nothing)."""
+    thousands = plan["read"].get("thousands")
+    valid = np.ones(len(frame), dtype=bool)
+    for column, dtype in plan["read"].get("dtype", {}).items():
+        if column in frame.columns and _is_numeric(dtype):
+            values = frame[column]
+            number = _numbers(values, thousands)
+            valid &= (number.notna() | values.isna()).to_numpy()
+    return valid
+
+
+def _repair(rows, surplus, header, plan):
+    """
+    Re-join rows that carry `surplus` extra fields.
+
+    For each candidate text column the surplus fields after it are
+    glued back onto it with commas; the first candidate that leaves
+    every numeric column parseable wins. Returns the repaired rows
+    (header columns) and a mask of which rows could be repaired.
+    """
+    width = len(header)
+    fields = rows.iloc[:, :width + surplus]
+    repaired = pd.DataFrame(index=rows.index, columns=header, dtype="string")
+    fixed = np.zeros(len(rows), dtype=bool)
+
+    for position in _text_positions(header, plan):
+        pending = ~fixed
+        if not pending.any():
+            break
+
+        part = fields[pending]
+        merged = part.iloc[:, position].str.cat(
+            [part.iloc[:, position + j] for j in range(1, surplus + 1)],
+            sep=",", na_rep=""
+        )
+        candidate = pd.concat(
+            [part.iloc[:, :position], merged,
+             part.iloc[:, position + surplus + 1:]],
+            axis=1
+        )
+        candidate.columns = header
+
+        ok = _numbers_valid(candidate, plan)
+        accepted = np.flatnonzero(pending)[ok]
+        repaired.iloc[accepted] = candidate[ok].to_numpy()
+        fixed[accepted] = True
+
+    return repaired, fixed
+
+
+def _apply_dtypes(frame, plan):
+    """Give text fields the dtypes a strict read would have produced."""
+    thousands = plan["read"].get("thousands")
+    for column, dtype in plan["read"].get("dtype", {}).items():
+        values = frame[column]
+        if _is_numeric(dtype):
+            values = _numbers(values, thousands)
+            dtype = pd.api.types.pandas_dtype(dtype)
+            integer = isinstance(dtype, np.dtype) and dtype.kind in "iu"
+            if integer and values.isna().any():
+                dtype = str(dtype).capitalize()    # int32 -> Int32
+        frame[column] = values.astype(dtype)
+    return frame
+
+
+def split_malformed(wide, header, plan, first_line):
+    """
+    Separate, repair and type the rows of one widened chunk.
+
+    Returns (rows with the header's columns and the plan's dtypes,
+    quarantine table for the malformed rows).
+    """
+    width = len(header)
+    spare = wide.iloc[:, width:].notna().to_numpy()
+    # Surplus = position of the last filled spare column (+1)
+    filled = spare.any(axis=1)
+    surplus = np.where(
+        filled, spare.shape[1] - np.argmax(spare[:, ::-1], axis=1), 0
+    )
+
+    rows = wide.iloc[:, :width].copy()
+    rows.columns = header
+    keep = surplus == 0
+
+    repaired_mask = np.zeros(len(wide), dtype=bool)
+    for extra in np.unique(surplus[filled]):
+        group = np.flatnonzero(surplus == extra)
+        fixed_rows, fixed = _repair(wide.iloc[group], extra, header, plan)
+        rows.iloc[group[fixed]] = fixed_rows[fixed].to_numpy()
+        repaired_mask[group[fixed]] = True
+
+    keep |= repaired_mask
+    bad = np.flatnonzero(filled)
+    quarantine = pd.DataFrame({
+        "Line": first_line + bad,
+        "Fields": width + surplus[bad],
+        "Repaired": repaired_mask[bad],
+        "Raw": wide.iloc[bad].apply(
+            lambda r: ",".join(r.dropna().astype(str)), axis=1
+        ).astype("string") if len(bad) else pd.Series(dtype="string")
+    })
+
+    rows = _apply_dtypes(rows[keep].reset_index(drop=True), plan)
+    usecols = plan["read"].get("usecols")
+    if usecols is not None:
+        rows = rows[[c for c in header if c in usecols]]
+    return rows, quarantine.reset_index(drop=True)
+
+
+def _first_row_width(path, encoding):
+    """Number of fields in the first data row (0 for no rows)."""
+    with open(path, encoding=encoding, newline="") as f:
+        rows = csv.reader(f)
+        next(rows, None)
+        return len(next(rows, []))
+
+
+def _strict_chunks(path, options, chunksize, columns):
+    with pd.read_csv(path, index_col=False, chunksize=chunksize,
+                     **options) as reader:
+        for chunk in reader:
+            yield chunk[columns]
+
+
+def read_fast(path, plan, chunksize=None):
+    """
+    Strict typed read of a catalog (or an iterator of chunks).
+
+    With `usecols` the C parser stops checking field counts and shifts
+    a row's surplus fields into the wrong columns, so every column is
+    parsed and the plan's columns are selected afterwards. The parser
+    then raises ParserError ("Expected N fields") on a row with surplus
+    fields; the first row, which sets N, is checked here. A malformed
+    row can also make a typed column fail to convert. Both surface as
+    ValueError, the cue to fall back to the tolerant reader.
+    """
+    encoding = plan["read"]["encoding"]
+    header = read_header(path, encoding)
+    if _first_row_width(path, encoding) > len(header):
+        raise ValueError("first row has surplus fields")
+
+    options = dict(plan["read"])
+    usecols = options.pop("usecols", None)
+    columns = header if usecols is None \
+        else [c for c in header if c in usecols]
+
+    if chunksize is not None:
+        return _strict_chunks(path, options, chunksize, columns)
+    raw = pd.read_csv(path, index_col=False, **options)
+    return raw if usecols is None else raw[columns]
+
+
+def _wide_reader(path, plan, header, skip_rows, chunksize, extra):
+    names = header + [f"_extra{i}" for i in range(1, extra + 1)]
+    return pd.read_csv(
+        path, header=None, names=names, skiprows=1 + skip_rows,
+        dtype="string", chunksize=chunksize, index_col=False,
+        encoding=plan["read"]["encoding"],
+        na_values=plan["read"].get("na_values")
+    )
+
+
+def iter_tolerant(path, plan, chunksize, skip_rows=0):
+    """Yield (rows, quarantine) per chunk, starting `skip_rows` data rows in."""
+    header = read_header(path, plan["read"]["encoding"])
+    first_line = 2 + skip_rows
+    with _wide_reader(path, plan, header, skip_rows, chunksize,
+                      EXTRA_FIELDS) as reader:
+        for wide in reader:
+            yield split_malformed(wide, header, plan, first_line)
+            first_line += len(wide)
+
+
+def read_tolerant(path, plan):
+    """
+    Read a whole catalog that a strict read rejected.
+
+    The spare-column count doubles (up to MAX_EXTRA_FIELDS) until every
+    row fits. Returns (rows as a strict read would give them,
+    quarantine table).
+    """
+    header = read_header(path, plan["read"]["encoding"])
+    extra = EXTRA_FIELDS
+    while True:
+        try:
+            wide = _wide_reader(path, plan, header, 0, None, extra)
+            break
+        except pd.errors.ParserError:
+            if extra >= MAX_EXTRA_FIELDS:
+                raise
+            extra *= 2
+    return split_malformed(wide, header, plan, first_line=2)
+
+
+# =================================================
+# REPRODUCIBLE CHECK
+# =================================================
+def _csv_field(value):
+    """One CSV field, quoted only when it has to be."""
+    if any(c in value for c in ',"\r\n'):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def malformed_copy(path, target, every=EVERY, start=START):
+    """
+    Write a copy of a catalog CSV with broken rows (see EVERY).
+
+    The stray field goes between two adjacent numeric columns, so no
+    text column can absorb it. Only rows whose title holds an inner
+    space are touched. Returns {MovieID: line number} of the rows given
+    a stray comma (in place of the title's first space) and of the
+    rows given a stray field.
+    """
+    plan = compile_plan(path)
+    encoding = plan["read"]["encoding"]
+    header = read_header(path, encoding)
+    dtypes = plan["read"].get("dtype", {})
+    numeric = [_is_numeric(dtypes.get(c, "string")) for c in header]
+    title_at = header.index(next(
+        raw for raw, name in plan["rename"].items() if name == "MovieName"
+    ))
+    stray_at = next(
+        i for i in range(1, len(header)) if numeric[i - 1] and numeric[i]
+    )
+
+    with open(path, encoding=encoding, newline="") as f:
+        lines = f.read().splitlines(keepends=True)
+
+    titles, broken = {}, {}
+    for number in range(1 + start, len(lines), every):
+        line = lines[number]
+        body = line.rstrip("\r\n")
+        fields = next(csv.reader([body]))
+        title = fields[title_at]
+        if " " not in title.strip() or title != title.lstrip():
+            continue
+
+        out = [_csv_field(field) for field in fields]
+        if len(titles) <= len(broken):
+            out[title_at] = title.replace(" ", ",", 1)
+            titles[int(fields[0])] = number + 1
+        else:
+            out.insert(stray_at, "stray")
+            broken[int(fields[0])] = number + 1
+        lines[number] = ",".join(out) + line[len(body):]
+
+    with open(target, "w", encoding=encoding, newline="") as f:
+        f.writelines(lines)
+    return titles, broken
+
+
+def check_repairs(path, chunksize=100, every=EVERY, start=START):
+    """
+    Break a copy of `path` (malformed_copy) and check that the tolerant
+    readers recover it: parse_catalog() and iter_movies() (which
+    switches readers mid-stream) must both equal the clean parse with
+    the stray-comma titles kept and the stray-field rows dropped, and
+    the quarantine table must list exactly the broken rows. The clean
+    file must parse on the strict fast path and the broken copy must
+    be rejected by it.
+    Raises AssertionError otherwise; returns a summary dict.
+    """
+    # catalog imports this module, so import it only when checking
+    from catalog import iter_movies, parse_catalog
+
+    try:
+        read_fast(path, compile_plan(path))
+    except ValueError as error:
+        raise AssertionError(
+            f"clean file left the fast path: {error}"
+        ) from error
+
+    clean, _ = parse_catalog(path)
+    with tempfile.TemporaryDirectory() as folder:
+        target = os.path.join(folder, os.path.basename(path))
+        titles, broken = malformed_copy(path, target, every, start)
+        try:
+            read_fast(target, compile_plan(target))
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("fast path accepted the broken copy")
+        parsed, quarantine = parse_catalog(target)
+        streamed = pd.concat(iter_movies(target, chunksize),
+                             ignore_index=True)
+
+    expected = clean[~clean["MovieID"].isin(list(broken))]
+    expected = expected.reset_index(drop=True)
+    renamed = expected["MovieID"].isin(list(titles))
+    expected.loc[renamed, "MovieName"] = (
+        expected.loc[renamed, "MovieName"].str.replace(" ", ",", n=1)
+    )
+
+    # Categories depend on which rows were read (and on the chunk), so
+    # categorical columns are compared by value
+    frames = []
+    for frame in (parsed, streamed, expected):
+        categorical = frame.select_dtypes("category").columns
+        frames.append(frame.astype({c: "string" for c in categorical}))
+    parsed, streamed, expected = frames
+
+    pd.testing.assert_frame_equal(parsed, expected)
+    pd.testing.assert_frame_equal(streamed, expected, check_dtype=False)
+    lines = dict(zip(quarantine["Line"], quarantine["Repaired"]))
+    assert lines == {
+        **{line: True for line in titles.values()},
+        **{line: False for line in broken.values()}
+    }, "quarantine table does not list exactly the broken rows"
+
+    return {
+        "rows": len(clean),
+        "repaired": len(titles),
+        "quarantined": len(broken),
+        "quarantine_lines": quarantine["Line"].tolist()
+    }
+
+
+if __name__ == "__main__":
+    for csv_path in sys.argv[1:] or ["asta.csv"]:
+        summary = check_repairs(csv_path)
+        print(f"{csv_path}: {summary['rows']} rows, "
+              f"{summary['repaired']} repaired, "
+              f"{summary['quarantined']} quarantined - OK")
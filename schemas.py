@@ -0,0 +1,261 @@
+"""
+Declared read schemas and compiled load plans for movie catalog CSVs.
+
+Each schema lists the raw columns worth parsing (`usecols`), their
+dtypes and the placeholder tokens that mean "missing". Long text
+columns the apps never use (Description, Director, Star) are left out,
+so the CSV parser skips them instead of building object columns.
+
+compile_plan() reads only the header of a file, detects which layout
+it uses and turns the matching schema into a plan: read_csv options,
+a rename to the canonical column names and a set of vectorized
+column conversions. Plans are cached per file version. Files whose
+header matches no declared layout (a new vendor feed) get a plan
+built from COLUMN_ALIASES instead.
+"""
+
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from converters import parse_count, parse_money, parse_score
+from text_repair import detect_encoding, repair_text
+
+
+# Placeholder tokens used by the scraped catalogs for missing values
+NA_TOKENS = ["-----", "*****", "---"]
+
+# Columns every app needs after loading
+REQUIRED_COLUMNS = ["MovieID", "MovieName", "Genre", "BaseRating"]
+
+SCHEMAS = {
+    # asta.csv: IMDb top-1000 scrape, comma-separated genres
+    "asta": {
+        "usecols": [
+            "Unnamed: 0", "Name of movie", "Year of relase", "Watchtime",
+            "Genre", "PG_Rating", "Movie Rating", "Metascore", "Votes",
+            "Gross collection"
+        ],
+        "dtype": {
+            "Unnamed: 0": np.int32,
+            "Name of movie": "string",
+            "Year of relase": "string",      # e.g. "II 2018"
+            "Watchtime": "Int32",
+            "Genre": "category",
+            "PG_Rating": "category",
+            "Movie Rating": np.float32,
+            "Metascore": np.float32,
+            "Votes": np.int32,               # "2,660,946" via thousands
+            "Gross collection": "string"     # "$28.34M", see convert
+        },
+        "thousands": ",",
+        "rename": {
+            "Unnamed: 0": "MovieID",
+            "Name of movie": "MovieName",
+            "Year of relase": "Year",
+            "Movie Rating": "BaseRating",
+            "Gross collection": "Gross"
+        },
+        "convert": {
+            "MovieName": "text",
+            "Year": "year",
+            "Genre": "genre",
+            "Gross": "money"
+        }
+    },
+
+    # asta1.csv: larger catalog, pipe-separated genres, numeric gross
+    "asta1": {
+        "usecols": [
+            "Unnamed: 0", "Gross Collection", "Genre", "Name of movie",
+            "Votes", "language", "budget", "Year of release", "imdb_score"
+        ],
+        "dtype": {
+            "Unnamed: 0": np.int32,
+            "Gross Collection": np.float64,
+            "Genre": "category",
+            "Name of movie": "string",
+            "Votes": "Int32",
+            "language": "category",
+            "budget": np.float64,
+            "Year of release": "Int32",
+            "imdb_score": np.float32
+        },
+        "rename": {
+            "Unnamed: 0": "MovieID",
+            "Gross Collection": "Gross",
+            "Name of movie": "MovieName",
+            "language": "Language",
+            "budget": "Budget",
+            "Year of release": "Year",
+            "imdb_score": "BaseRating"
+        },
+        "convert": {
+            "MovieName": "text",
+            "Genre": "genre"
+        }
+    }
+}
+
+# Header aliases used for files that match no declared layout
+COLUMN_ALIASES = {
+    "MovieID": ["MovieID", "movie_id", "id", "Unnamed: 0"],
+    "MovieName": ["MovieName", "Title", "Movie", "Name", "Name of movie"],
+    "Genre": ["Genre", "Genres", "Category"],
+    "BaseRating": [
+        "BaseRating", "Rating", "IMDB_Rating", "Score",
+        "Movie Rating", "imdb_score"
+    ]
+}
+
+
+# =================================================
+# VECTORIZED CONVERSIONS
+# =================================================
+def convert_year(values):
+    """Year as nullable Int32 ("II 2018" / "2018" -> 2018)."""
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype("Int32")
+    year = values.astype("string").str.extract(r"(\d{4})\s*$")[0]
+    return pd.to_numeric(year, errors="coerce").astype("Int32")
+
+
+def canonical_genres(labels):
+    """
+    Canonical spelling of genre strings: padding stripped, genre names
+    title-cased ("sci-fi" -> "Sci-Fi"), repeats and empty names
+    dropped and ", " between genres ("Crime|Drama" -> "Crime, Drama").
+    Genre order is kept, since the first genre is the main one.
+    """
+    labels = pd.Series(labels)
+    names = labels.str.split(r"[,|]", regex=True).explode()
+    names = names.str.strip().str.title()
+    names = names[names.notna() & (names != "")]
+    joined = names.groupby(level=0, sort=False).agg(
+        lambda group: ", ".join(dict.fromkeys(group))
+    )
+    return joined.reindex(labels.index).astype(labels.dtype)
+
+
+def convert_genre(values):
+    """
+    Genre as a categorical of canonical genre strings (see
+    canonical_genres). Categorical columns are fixed on their
+    categories only, so the work scales with distinct values, not rows.
+    """
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype("category")
+
+    fixed = pd.Index(canonical_genres(values.cat.categories))
+    categories = pd.Index(fixed.dropna().unique())
+    codes = categories.get_indexer(fixed)[values.cat.codes]
+    codes[values.cat.codes.to_numpy() == -1] = -1
+    return pd.Series(
+        pd.Categorical.from_codes(codes, categories),
+        index=values.index, name=values.name
+    )
+
+
+CONVERTERS = {
+    "text": repair_text,
+    "year": convert_year,
+    "genre": convert_genre,
+    "count": parse_count,
+    "money": parse_money,
+    "score": parse_score
+}
+
+
+# =================================================
+# LAYOUT DETECTION + PLANS
+# =================================================
+# Compiled plans, keyed by absolute path -> (file stat, plan)
+_plans = {}
+_plans_lock = threading.Lock()
+
+
+def read_header(path, encoding):
+    """Raw column names of a CSV file, read without parsing any rows."""
+    return list(pd.read_csv(path, nrows=0, encoding=encoding).columns)
+
+
+def detect_layout(columns):
+    """Name of the declared schema whose columns all appear in `columns`."""
+    present = set(columns)
+    for name, schema in SCHEMAS.items():
+        if set(schema["usecols"]) <= present:
+            return name
+    return None
+
+
+def build_plan(path):
+    """Compile the load plan for a file from its header."""
+    encoding = detect_encoding(path)
+    columns = read_header(path, encoding)
+    layout = detect_layout(columns)
+
+    if layout is not None:
+        schema = SCHEMAS[layout]
+        read = {key: schema[key] for key in ("usecols", "dtype", "thousands")
+                if key in schema}
+        rename = dict(schema["rename"])
+        convert = dict(schema["convert"])
+    else:
+        # Unknown feed: map the first alias present for each app column
+        stripped = {c.strip(): c for c in columns}
+        rename = {}
+        for canonical, aliases in COLUMN_ALIASES.items():
+            found = next((a for a in aliases if a in stripped), None)
+            if found is not None:
+                rename[found] = canonical
+        read = {}
+        convert = {"MovieName": "text", "Genre": "genre"}
+
+    missing = set(REQUIRED_COLUMNS) - set(rename.values()) - {
+        c.strip() for c in columns
+    }
+    if missing:
+        raise ValueError(
+            f"{os.path.basename(path)}: missing required columns "
+            f"{sorted(missing)}"
+        )
+
+    read.update(encoding=encoding, na_values=NA_TOKENS)
+    return {"layout": layout, "read": read, "rename": rename,
+            "convert": convert}
+
+
+def compile_plan(path):
+    """Load plan for `path`, compiled once per file version."""
+    key = os.path.abspath(path)
+    info = os.stat(path)
+    stat = (info.st_mtime_ns, info.st_size)
+
+    with _plans_lock:
+        cached = _plans.get(key)
+        if cached is not None and cached[0] == stat:
+            return cached[1]
+
+    plan = build_plan(path)
+    with _plans_lock:
+        _plans[key] = (stat, plan)
+    return plan
+
+
+def read_options(path):
+    """Keyword arguments for pd.read_csv() that apply the file's plan."""
+    return dict(compile_plan(path)["read"])
+
+
+def apply_plan(raw, plan):
+    """Rename a freshly read frame to canonical columns and convert types."""
+    frame = raw.copy()
+    frame.columns = frame.columns.str.strip()
+    frame = frame.rename(columns=plan["rename"])
+
+    for column, converter in plan["convert"].items():
+        if column in frame.columns:
+            frame[column] = CONVERTERS[converter](frame[column])
+    return frame
@@ -0,0 +1,1081 @@
+"""
+Vectorized synthetic user-movie interactions.
+
+The apps used to build their interaction table row by row: for every
+user, iterrows() over a movie sample and one np.random call per field.
+generate_interactions() draws the same columns (UserID, MovieID,
+MovieName, Genre, UserRating, WatchTime, WatchDate) with the same
+distributions for every user at once, with a handful of
+numpy.random.Generator calls:
+
+    movies per user   distinct draws from the user's pool (with
+                      replacement only when the pool is too small)
+    UserRating        round(Normal(BaseRating, sigma), 1) clipped to
+                      1-5, or a uniform 4-5 for preference-driven users
+    WatchTime         uniform integer minutes in [60, 180)
+    WatchDate         uniform day of DATE_RANGE
+
+make_population() scales the hard-coded U01-U05 profiles up to a
+simulated population (up to millions of users), each with a genre
+preference vector and an activity level drawn from configurable
+distributions. Its interactions are simulated in fixed shards of
+users, each with its own SeedSequence.spawn() stream:
+population_interactions() runs the shards on the cores and writes
+them in place into one set of output arrays (bit-identical for any
+worker count), iter_population_interactions() yields them one at a
+time so memory stays bounded by the shard.
+
+For histories larger than RAM, iter_record_batches() streams the same
+rows as fixed-size record batches and write_batch_log() writes them to
+a directory of part files while the simulation runs:
+
+    python simulate.py log interactions/ 1000000
+
+zipf_interactions() replaces the uniform draws with a production-like
+load profile (hot movies, bursty sessions, runtimes from Watchtime) for
+benchmarks of groupbys, top-K and caches:
+
+    python simulate.py profile 100000
+
+population_table() caches one population's interactions per dataset
+version and settings for the dashboard; populations too large for an
+interactive rerun are simulated from the command line instead:
+
+    python simulate.py population 1000000 zipf
+
+Benchmark against the iterrows loop:
+
+    python simulate.py 20000000
+"""
+
+import atexit
+import hashlib
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from catalog import load_movies
+from converters import TEXT_DTYPE
+from genres import AliasSampler, build_genre_index
+
+# Record batches are Arrow when pyarrow is installed, NumPy structured
+# arrays otherwise
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+# Days a watch can fall on (inclusive)
+DATE_RANGE = ("2024-01-01", "2024-06-30")
+
+# Watch time in minutes, upper bound excluded (as np.random.randint)
+WATCH_TIME = (60, 180)
+
+# Ratings of preference-driven users: 4 or 5
+LIKED_RATINGS = (4, 6)
+
+# Bounds of a noisy rating around BaseRating
+RATING_RANGE = (1, 5)
+
+# Columns of the generated interaction table
+INTERACTION_COLUMNS = [
+    "UserID", "MovieID", "MovieName",
+    "Genre", "UserRating", "WatchTime", "WatchDate"
+]
+
+# Cells of random keys drawn at once when sampling dense pools
+BLOCK_CELLS = 1 << 22
+
+# Distributions of the number of movies a simulated user watches,
+# as functions of (rng, users, mean)
+ACTIVITY = {
+    "fixed": lambda rng, n, mean: np.full(n, round(mean), dtype=np.int64),
+    "poisson": lambda rng, n, mean: rng.poisson(mean, n),
+    # Heavy tail: a few binge watchers, many occasional viewers
+    "lognormal": lambda rng, n, mean: np.round(
+        rng.lognormal(np.log(mean) - 0.5, 1.0, n)
+    ).astype(np.int64)
+}
+
+# Shards each extra worker process must get before the pool fans out:
+# starting a spawned worker costs about as much as simulating a dozen
+# shards, so small populations run in the calling process
+SHARDS_PER_WORKER = 16
+
+# Arrays a population shard produces, with their dtypes
+SHARD_COLUMNS = {
+    "user": np.int32,       # user position in the population
+    "row": np.int32,        # movie row position
+    "rating": np.int8,
+    "minutes": np.int16,    # WatchTime
+    "day": np.int16         # WatchDate as a day of DATE_RANGE
+}
+
+# Cached interaction tables and per-user parts kept per process
+MAX_TABLES = 32
+MAX_USER_PARTS = 4096
+
+# Simulated population tables kept per process (each can be millions
+# of rows, so only a few)
+MAX_POPULATIONS = 4
+
+# Columns of streamed record batches
+RECORD_FIELDS = ["UserID", "MovieID", "UserRating", "WatchTime", "WatchDate"]
+
+# Rows per streamed record batch, and batches per part file on disk
+BATCH_ROWS = 1 << 16
+BATCHES_PER_PART = 64
+
+# Load profile: Zipf exponent of movie popularity, mean sessions per
+# user, mean movies per session, scale (days) and Lomax shape of the
+# heavy-tailed gaps between sessions, and Beta(a, b) of the share of a
+# movie watched
+ZIPF_EXPONENT = 1.1
+SESSIONS_PER_USER = 4
+SESSION_LENGTH = 3
+SESSION_GAP_DAYS = 5
+GAP_SHAPE = 1.5
+COMPLETION = (5, 1)
+
+# Affinity every movie keeps for every user, so that simulated users
+# occasionally watch outside their preferred genres
+EXPLORATION = 0.02
+
+
+def genre_pools(movies, user_genres, limit=None, index=None):
+    """
+    Row positions of the movies having any of a user's genres
+    (case-insensitive), one array per user; with `limit` only the first
+    `limit` matches are kept.
+
+    `index` is a GenreIndex of the catalog `movies` is a prefix of
+    (e.g. load_genre_index(path) for movies.head(n)); without it one is
+    built from movies["Genre"].
+    """
+    if index is None:
+        index = build_genre_index(movies["Genre"])
+    return [
+        index.rows_for(genres, limit=len(movies))[:limit]
+        for genres in user_genres
+    ]
+
+
+def genre_samplers(movies, user_preferences, index=None):
+    """
+    One AliasSampler per user over the movies having any of the user's
+    genres, weighted by the summed weight of the genres each movie has
+    (a genre list weighs every genre 1). Same `index` as genre_pools().
+    """
+    if index is None:
+        index = build_genre_index(movies["Genre"])
+    return [
+        index.sampler(preferences, limit=len(movies))
+        for preferences in user_preferences
+    ]
+
+
+def _distinct_draws(rng, size, users, k):
+    """`k` distinct positions in range(size) for each of `users` users."""
+    if 4 * k <= size:
+        # Sparse case: draw with replacement, then redraw the repeats,
+        # re-checking only the users that had one
+        draws = rng.integers(0, size, (users, k), dtype=np.int32)
+        pending = np.arange(users)
+        while len(pending):
+            part = draws[pending]
+            order = np.argsort(part, axis=1)
+            ordered = np.take_along_axis(part, order, axis=1)
+            repeated = ordered[:, 1:] == ordered[:, :-1]
+            rows, cols = np.nonzero(repeated)
+            part[rows, order[rows, cols + 1]] = rng.integers(
+                0, size, len(rows), dtype=np.int32
+            )
+            draws[pending] = part
+            pending = pending[repeated.any(axis=1)]
+        return draws
+
+    # Dense case: the k smallest of one random key per pool entry,
+    # a block of users at a time to bound memory
+    draws = np.empty((users, k), dtype=np.int64)
+    block = max(1, BLOCK_CELLS // size)
+    for start in range(0, users, block):
+        keys = rng.random((min(block, users - start), size), dtype=np.float32)
+        smallest = np.argpartition(keys, k - 1, axis=1)[:, :k]
+        draws[start:start + block] = smallest
+    return draws
+
+
+def draw_movies(rng, pools, user_pool, per_user=None):
+    """
+    Movie rows watched by every user.
+
+    `pools` holds arrays of movie row positions (drawn uniformly) or
+    AliasSamplers (drawn by weight), and `user_pool[u]` is the pool
+    user u draws from. Each user gets `per_user` movies, distinct
+    unless the pool is smaller, or the whole pool when `per_user` is
+    None. Returns (user index, movie row), grouped by user.
+    """
+    user_pool = np.asarray(user_pool)
+    user_parts, row_parts = [], []
+    for number, pool in enumerate(pools):
+        members = np.flatnonzero(user_pool == number)
+        if not len(members) or not len(pool):
+            continue
+
+        rows = pool.rows if isinstance(pool, AliasSampler) else pool
+        if per_user is None:
+            chosen = np.broadcast_to(rows, (len(members), len(rows)))
+        elif isinstance(pool, AliasSampler):
+            chosen = pool.sample(rng, len(members), per_user)
+        elif per_user > len(pool):
+            picks = rng.integers(0, len(pool), (len(members), per_user))
+            chosen = pool[picks]
+        else:
+            chosen = pool[
+                _distinct_draws(rng, len(pool), len(members), per_user)
+            ]
+
+        user_parts.append(np.repeat(members, chosen.shape[1]))
+        row_parts.append(chosen.ravel())
+
+    if not user_parts:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    user_index = np.concatenate(user_parts)
+    rows = np.concatenate(row_parts)
+    if len(user_parts) > 1:
+        order = np.argsort(user_index, kind="stable")
+        user_index, rows = user_index[order], rows[order]
+    return user_index, rows
+
+
+def generate_interactions(movies, users, pools, user_pool=None,
+                          per_user=None, sigma=None, seed=None,
+                          dates=DATE_RANGE, columns=("MovieName", "Genre")):
+    """
+    Interaction table for every user in one pass.
+
+    `pools`/`user_pool`/`per_user` select the movies as in
+    draw_movies(); `user_pool` defaults to one shared pool, or one pool
+    per user when there are as many pools as users. With `sigma` the
+    rating is a noisy BaseRating, otherwise a liked-genre 4-5.
+    `columns` are the movie columns copied next to MovieID.
+    """
+    rng = np.random.default_rng(seed)
+    if user_pool is None:
+        one_each = len(pools) == len(users) and len(pools) > 1
+        user_pool = np.arange(len(users)) if one_each \
+            else np.zeros(len(users), dtype=np.int64)
+    user_index, rows = draw_movies(rng, pools, user_pool, per_user)
+
+    if sigma is None:
+        ratings = rng.integers(*LIKED_RATINGS, len(rows), dtype=np.int8)
+    else:
+        base = movies["BaseRating"].to_numpy(dtype=np.float64)[rows]
+        ratings = np.round(rng.normal(base, sigma), 1).clip(*RATING_RANGE)
+
+    minutes = rng.integers(*WATCH_TIME, len(rows), dtype=np.int16)
+    days = rng.integers(0, len(pd.date_range(*dates)), len(rows))
+
+    user_ids = pd.array(np.asarray(users), dtype=TEXT_DTYPE)
+    return _interaction_frame(
+        movies, user_ids, user_index, rows, ratings, minutes, days, dates,
+        columns
+    )
+
+
+# Interaction tables keyed by (dataset version, caller key, options) and
+# single-user parts keyed by (dataset version, user, position, pool
+# digest, options)
+_tables = {}
+_user_parts = {}
+_parts_lock = threading.Lock()
+
+# Population tables keyed by (dataset version, caller key, options)
+_populations = {}
+
+# Worker pools shared by every population_interactions() call, keyed by
+# number of workers; a pool is never shut down while the process runs,
+# so a thread still submitting to it cannot find it closed
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def user_rng(seed, user_number):
+    """
+    Generator of one user's private stream: the user_number-th child of
+    SeedSequence(seed), independent of every other user's draws.
+    """
+    return np.random.default_rng(
+        np.random.SeedSequence(seed, spawn_key=(user_number,))
+    )
+
+
+def _remember(cache, key, value, limit):
+    """Store a cache entry, dropping the oldest ones beyond `limit`."""
+    cache[key] = value
+    while len(cache) > limit:
+        del cache[next(iter(cache))]
+
+
+def incremental_interactions(movies, users, pools, version, key=None,
+                             per_user=None, sigma=None, seed=None,
+                             dates=DATE_RANGE,
+                             columns=("MovieName", "Genre")):
+    """
+    generate_interactions() with one RNG stream per user and caching.
+
+    The whole table is cached under (dataset `version`, `key`, options);
+    black4.py passes num_movies as `key`. On a miss, each user's rows are
+    reused as long as the MovieIDs in that user's pool did not change,
+    and the user keeps their position in `users`, and only the other
+    users are re-simulated, from their own user_rng() stream, so a
+    user's rows never depend on anyone else's draws.
+    """
+    options = (per_user, sigma, seed, dates, tuple(columns))
+    table_key = (version, key, tuple(users), options)
+    with _parts_lock:
+        if key is not None and table_key in _tables:
+            return _tables[table_key]
+
+    movie_ids = movies["MovieID"].to_numpy()
+    user_ids = pd.array(np.asarray(users), dtype=TEXT_DTYPE)
+    parts = []
+    for number, (user, pool) in enumerate(zip(users, pools)):
+        digest = hashlib.blake2b(
+            np.ascontiguousarray(movie_ids[pool]).tobytes(), digest_size=16
+        ).hexdigest()
+        # The user's stream is user_rng(seed, number), so the part is
+        # only valid for the same position in `users`
+        part_key = (version, user, number, digest, options)
+        with _parts_lock:
+            part = _user_parts.get(part_key)
+
+        if part is None:
+            rng = user_rng(seed, number)
+            _, rows = draw_movies(rng, [pool], [0], per_user)
+            if sigma is None:
+                ratings = rng.integers(*LIKED_RATINGS, len(rows),
+                                       dtype=np.int8)
+            else:
+                base = movies["BaseRating"].to_numpy(dtype=np.float64)[rows]
+                ratings = np.round(rng.normal(base, sigma), 1).clip(
+                    *RATING_RANGE
+                )
+            minutes = rng.integers(*WATCH_TIME, len(rows), dtype=np.int16)
+            days = rng.integers(0, len(pd.date_range(*dates)), len(rows))
+            part = _interaction_frame(
+                movies, user_ids, np.full(len(rows), number), rows, ratings,
+                minutes, days, dates, columns, observed=False
+            )
+            with _parts_lock:
+                _remember(_user_parts, part_key, part, MAX_USER_PARTS)
+        parts.append(part)
+
+    table = _observed_categories(pd.concat(parts, ignore_index=True), columns)
+    if key is not None:
+        with _parts_lock:
+            _remember(_tables, table_key, table, MAX_TABLES)
+    return table
+
+
+def _observed_categories(frame, columns):
+    """Drop the categories of `columns` that no row of `frame` uses."""
+    for column in columns:
+        if isinstance(frame[column].dtype, pd.CategoricalDtype):
+            frame[column] = frame[column].cat.remove_unused_categories()
+    return frame
+
+
+def _interaction_frame(movies, user_ids, user_index, rows, ratings, minutes,
+                       days, dates, columns, observed=True):
+    """
+    Assemble drawn users, movies and fields into the interaction table.
+
+    Categorical columns keep only the categories of the drawn movies,
+    so value_counts() lists observed values only; with observed=False
+    they keep the catalog's categories (parts that will be
+    concatenated need the same ones).
+    """
+    calendar = pd.date_range(*dates).to_numpy()
+
+    # Array takes keep each column's dtype (Arrow strings, categories)
+    # instead of materializing Python strings per row
+    frame = {
+        "UserID": user_ids.take(user_index),
+        "MovieID": movies["MovieID"].to_numpy()[rows]
+    }
+    for column in columns:
+        frame[column] = movies[column].array.take(rows)
+    frame["UserRating"] = ratings
+    frame["WatchTime"] = minutes
+    frame["WatchDate"] = calendar[days]
+    frame = pd.DataFrame(frame)
+    return _observed_categories(frame, columns) if observed else frame
+
+
+def genre_matrix(movies):
+    """
+    Genre vocabulary and dense multi-hot movie x genre matrix (float32).
+
+    The split runs once per distinct Genre string (the column is
+    categorical), then rows are gathered by category code.
+    """
+    genre = movies["Genre"].astype("category")
+    dummies = genre.cat.categories.to_series().str.get_dummies(sep=",")
+    dummies.columns = dummies.columns.str.strip()
+    dummies = dummies.T.groupby(level=0).max().T
+    codes = genre.cat.codes.to_numpy()
+
+    matrix = np.zeros((len(movies), dummies.shape[1]), dtype=np.float32)
+    known = codes >= 0
+    matrix[known] = dummies.to_numpy(dtype=np.float32)[codes[known]]
+    return pd.Index(dummies.columns, name="Genre"), matrix
+
+
+@dataclass
+class Population:
+    """Simulated users with a genre preference vector each."""
+
+    user_ids: pd.api.extensions.ExtensionArray  # "U0000001", ...
+    genres: pd.Index                            # preference columns
+    preferences: np.ndarray                     # users x genres, sum 1
+    activity: np.ndarray                        # movies each user watches
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def favorite_genres(self):
+        """Each user's highest-weighted genre."""
+        return self.genres[np.argmax(self.preferences, axis=1)]
+
+
+def make_population(num_users, genres, concentration=0.5, popularity=None,
+                    activity="poisson", mean_watches=60, seed=None):
+    """
+    Draw `num_users` users with preferences over `genres`.
+
+    Preferences are Dirichlet(concentration * len(genres) * popularity):
+    `popularity` (default uniform) is the population-wide mean taste and
+    a small `concentration` gives users a few dominant genres, a large
+    one near-identical tastes. Activity is drawn from ACTIVITY[activity]
+    with mean `mean_watches` (at least one movie per user).
+    """
+    rng = np.random.default_rng(seed)
+    genres = pd.Index(genres, name="Genre")
+    if popularity is None:
+        popularity = np.ones(len(genres))
+    popularity = np.asarray(popularity, dtype=np.float64)
+    alpha = concentration * len(genres) * popularity / popularity.sum()
+
+    preferences = rng.dirichlet(alpha, num_users).astype(np.float32)
+    watches = np.maximum(ACTIVITY[activity](rng, num_users, mean_watches), 1)
+
+    width = len(str(num_users))
+    numbers = np.arange(1, num_users + 1).astype(str)
+    user_ids = pd.array(
+        np.char.add("U", np.char.zfill(numbers, max(width, 2))),
+        dtype=TEXT_DTYPE
+    )
+    return Population(user_ids, genres, preferences, watches)
+
+
+def _top_k_per_row(keys, k):
+    """Column positions of each row's k[row] largest keys, row-major."""
+    limit = int(k.max()) if len(k) else 0
+    if limit == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    top = np.argpartition(-keys, limit - 1, axis=1)[:, :limit]
+    order = np.argsort(
+        -np.take_along_axis(keys, top, axis=1), axis=1, kind="stable"
+    )
+    top = np.take_along_axis(top, order, axis=1)
+    keep = np.arange(limit) < k[:, None]
+    return np.repeat(np.arange(len(keys)), k), top[keep]
+
+
+def _simulate_block(rng, weights, matrix, watches, num_days):
+    """
+    Interactions of one block of users, as arrays (see SHARD_COLUMNS).
+
+    A user's affinity for a movie is the preference weight of the
+    movie's genres (plus EXPLORATION). Movies are drawn without
+    replacement with probability proportional to affinity (an
+    exponential race over a users x movies block), and rated 4-5 with
+    probability affinity / the user's best affinity, 2-3 otherwise.
+    """
+    affinity = weights @ matrix.T + EXPLORATION
+
+    # Exponential race: the k earliest arrival times E / affinity
+    # are a weighted sample without replacement
+    arrival = rng.standard_exponential(affinity.shape, np.float32)
+    users, rows = _top_k_per_row(-(arrival / affinity), watches)
+
+    chosen = affinity[users, rows]
+    best = affinity.max(axis=1)[users] if len(users) else chosen
+    liked = rng.random(len(rows)) < chosen / best
+    ratings = np.where(
+        liked,
+        rng.integers(*LIKED_RATINGS, len(rows), dtype=np.int8),
+        rng.integers(2, 4, len(rows), dtype=np.int8)
+    )
+    return {
+        "user": users,
+        "row": rows,
+        "rating": ratings,
+        "minutes": rng.integers(*WATCH_TIME, len(rows), dtype=np.int16),
+        "day": rng.integers(0, num_days, len(rows), dtype=np.int16)
+    }
+
+
+@dataclass
+class ShardPlan:
+    """How a population is cut into shards, fixed before any work runs."""
+
+    weights: np.ndarray     # users x movie genres
+    matrix: np.ndarray      # movies x movie genres
+    watches: np.ndarray     # movies per user (capped at the catalog size)
+    bounds: np.ndarray      # user range of shard i: bounds[i]:bounds[i + 1]
+    offsets: np.ndarray     # output range of shard i, same layout
+    seeds: list             # one SeedSequence per shard
+    num_days: int
+
+
+def plan_shards(movies, population, seed=None, shard_users=None,
+                dates=DATE_RANGE):
+    """
+    Cut the population into fixed blocks of `shard_users` users.
+
+    Shard boundaries and their SeedSequence children depend only on
+    the inputs and `seed`, never on how many workers run them, so
+    every worker count produces the same interactions.
+    """
+    genres, matrix = genre_matrix(movies)
+    weights = np.zeros((len(population), len(genres)), dtype=np.float32)
+    shared = population.genres.get_indexer(genres)
+    weights[:, shared >= 0] = population.preferences[:, shared[shared >= 0]]
+
+    if shard_users is None:
+        shard_users = max(1, BLOCK_CELLS // max(len(movies), 1))
+    watches = np.minimum(population.activity, len(movies))
+    bounds = np.append(
+        np.arange(0, len(population), shard_users), len(population)
+    )
+    offsets = np.concatenate([[0], np.cumsum(watches)])[bounds]
+    seeds = np.random.SeedSequence(seed).spawn(len(bounds) - 1)
+    num_days = len(pd.date_range(*dates))
+    return ShardPlan(weights, matrix, watches, bounds, offsets, seeds,
+                     num_days)
+
+
+def _run_shard(plan, shard, weights=None):
+    """Simulate one shard with its own stream; user ids are absolute."""
+    start, end = plan.bounds[shard], plan.bounds[shard + 1]
+    if weights is None:
+        weights = plan.weights
+    block = _simulate_block(
+        np.random.default_rng(plan.seeds[shard]), weights[start:end],
+        plan.matrix, plan.watches[start:end], plan.num_days
+    )
+    block["user"] += start
+    return block
+
+
+def iter_population_interactions(movies, population, seed=None,
+                                 shard_users=None, dates=DATE_RANGE,
+                                 columns=("MovieName", "Genre")):
+    """
+    Yield the population's interactions one shard of users at a time.
+
+    Memory stays bounded by the shard; the frames are, in order, the
+    rows population_interactions() returns for the same seed.
+    """
+    plan = plan_shards(movies, population, seed, shard_users, dates)
+    for shard in range(len(plan.seeds)):
+        block = _run_shard(plan, shard)
+        yield _interaction_frame(
+            movies, population.user_ids, block["user"], block["row"],
+            block["rating"], block["minutes"], block["day"], dates, columns
+        )
+
+
+@contextmanager
+def _shared_arrays(specs, names=None):
+    """
+    numpy arrays over shared memory, one block per column of `specs`
+    (column -> (dtype, shape)). Without `names` the blocks are created
+    (and unlinked on exit), otherwise the named blocks are attached.
+    Yields (column -> block name, column -> array).
+    """
+    memories, arrays = {}, {}
+    try:
+        for column, (dtype, shape) in specs.items():
+            size = max(1, np.dtype(dtype).itemsize * int(np.prod(shape)))
+            memories[column] = shared_memory.SharedMemory(
+                name=None if names is None else names[column],
+                create=names is None, size=size
+            )
+            arrays[column] = np.ndarray(shape, dtype, memories[column].buf)
+        yield {c: m.name for c, m in memories.items()}, arrays
+    finally:
+        arrays.clear()
+        for memory in memories.values():
+            try:
+                memory.close()
+            except BufferError:     # a view is still alive; gc closes it
+                pass
+            if names is None:
+                memory.unlink()
+
+
+def _shard_worker(plan, shard, specs, names):
+    """Process-pool task: simulate a shard straight into shared memory."""
+    with _shared_arrays(specs, names) as (_, arrays):
+        block = _run_shard(plan, shard, arrays["weights"])
+        start, end = plan.offsets[shard], plan.offsets[shard + 1]
+        for column in SHARD_COLUMNS:
+            arrays[column][start:end] = block[column]
+
+
+def default_workers(shards):
+    """
+    Worker processes worth starting for `shards` shards: at most one
+    per core, and only when each gets SHARDS_PER_WORKER shards.
+    """
+    return max(1, min(os.cpu_count() or 1, shards // SHARDS_PER_WORKER))
+
+
+def _worker_pool(workers):
+    """
+    The process pool of `workers` workers, started on first use and
+    kept for later calls (spawned workers are expensive to start).
+    """
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = _pools[workers] = ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return pool
+
+
+@atexit.register
+def _shutdown_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.shutdown()
+        _pools.clear()
+
+
+def population_interactions(movies, population, seed=None, workers=None,
+                            shard_users=None, dates=DATE_RANGE,
+                            columns=("MovieName", "Genre")):
+    """
+    The population's interactions as one frame, simulated in parallel.
+
+    Shards run on a pool of `workers` processes, kept between calls
+    (default: default_workers(); 1, e.g. on a single core or for a
+    small population, runs them in this process), and write their rows
+    straight into preallocated output arrays at offsets known up
+    front, so there is no concatenation step. The result is
+    bit-identical for any number of workers.
+    """
+    plan = plan_shards(movies, population, seed, shard_users, dates)
+    shards = len(plan.seeds)
+    total = int(plan.offsets[-1])
+    if workers is None:
+        workers = default_workers(shards)
+    workers = min(workers, shards)
+
+    if workers <= 1:
+        out = {c: np.empty(total, d) for c, d in SHARD_COLUMNS.items()}
+        for shard in range(shards):
+            block = _run_shard(plan, shard)
+            start, end = plan.offsets[shard], plan.offsets[shard + 1]
+            for column, array in out.items():
+                array[start:end] = block[column]
+        return _interaction_frame(
+            movies, population.user_ids, out["user"], out["row"],
+            out["rating"], out["minutes"], out["day"], dates, columns
+        )
+
+    # Output columns and the preference weights live in shared memory:
+    # workers write their rows in place and only the small plan is
+    # pickled to each task
+    specs = {c: (d, (total,)) for c, d in SHARD_COLUMNS.items()}
+    specs["weights"] = (plan.weights.dtype, plan.weights.shape)
+    light = replace(plan, weights=None)
+
+    with _shared_arrays(specs) as (names, arrays):
+        arrays["weights"][:] = plan.weights
+        pool = _worker_pool(workers)
+        tasks = [
+            pool.submit(_shard_worker, light, shard, specs, names)
+            for shard in range(shards)
+        ]
+        for task in tasks:
+            task.result()
+
+        return _interaction_frame(
+            movies, population.user_ids, arrays["user"], arrays["row"],
+            arrays["rating"], arrays["minutes"], arrays["day"], dates,
+            columns
+        )
+
+
+def _record_batch(columns, user_ids, movie_ids, calendar):
+    """One record batch (Arrow, or a NumPy structured array) of shard rows."""
+    values = {
+        "MovieID": movie_ids[columns["row"]],
+        "UserRating": columns["rating"],
+        "WatchTime": columns["minutes"],
+        "WatchDate": calendar[columns["day"]]
+    }
+    if pa is not None:
+        arrays = [user_ids.take(pa.array(columns["user"]))]
+        arrays += [pa.array(array) for array in values.values()]
+        return pa.RecordBatch.from_arrays(arrays, RECORD_FIELDS)
+
+    users = user_ids[columns["user"]]
+    batch = np.empty(len(users), dtype=[
+        ("UserID", users.dtype), *[(n, a.dtype) for n, a in values.items()]
+    ])
+    batch["UserID"] = users
+    for name, array in values.items():
+        batch[name] = array
+    return batch
+
+
+def iter_record_batches(movies, population, seed=None,
+                        batch_rows=BATCH_ROWS, shard_users=None,
+                        dates=DATE_RANGE):
+    """
+    Yield the population's interactions as record batches of exactly
+    `batch_rows` rows (the last one may be shorter).
+
+    Batches hold RECORD_FIELDS (UserID, MovieID, UserRating, WatchTime,
+    WatchDate as a date) and are pyarrow RecordBatches, or NumPy
+    structured arrays without pyarrow. Shards are simulated one at a
+    time, so memory stays bounded by a shard plus a batch whatever the
+    size of the history; the rows are those population_interactions()
+    returns for the same seed.
+    """
+    plan = plan_shards(movies, population, seed, shard_users, dates)
+    movie_ids = movies["MovieID"].to_numpy()
+    calendar = pd.date_range(*dates).to_numpy().astype("datetime64[D]")
+    if pa is not None:
+        user_ids = pa.array(population.user_ids)
+    else:
+        user_ids = np.asarray(population.user_ids, dtype=str)
+
+    carry = None
+    for shard in range(len(plan.seeds)):
+        block = _run_shard(plan, shard)
+        if carry is not None:
+            block = {c: np.concatenate([carry[c], block[c]]) for c in block}
+
+        full = len(block["row"]) // batch_rows * batch_rows
+        for start in range(0, full, batch_rows):
+            part = {c: a[start:start + batch_rows] for c, a in block.items()}
+            yield _record_batch(part, user_ids, movie_ids, calendar)
+        carry = {c: a[full:] for c, a in block.items()}
+
+    if carry is not None and len(carry["row"]):
+        yield _record_batch(carry, user_ids, movie_ids, calendar)
+
+
+def write_batch_log(batches, directory, batches_per_part=BATCHES_PER_PART):
+    """
+    Write record batches to `directory` while they are produced.
+
+    Batches go to part-00000.arrow, part-00001.arrow, ... (Arrow IPC
+    files of `batches_per_part` batches each), or to one part-NNNNN.npy
+    per batch without pyarrow. A part only gets its final name once it
+    is complete, so readers never see a partial file. Returns the part
+    paths in order.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    writer = tmp = None
+    for number, batch in enumerate(batches):
+        if pa is None:
+            paths.append(os.path.join(directory, f"part-{number:05d}.npy"))
+            tmp = f"{paths[-1]}.tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, batch)
+            os.replace(tmp, paths[-1])
+            continue
+
+        if number % batches_per_part == 0:
+            if writer is not None:
+                writer.close()
+                os.replace(tmp, paths[-1])
+            part = number // batches_per_part
+            paths.append(os.path.join(directory, f"part-{part:05d}.arrow"))
+            tmp = f"{paths[-1]}.tmp"
+            writer = pa.ipc.new_file(tmp, batch.schema)
+        writer.write_batch(batch)
+
+    if writer is not None:
+        writer.close()
+        os.replace(tmp, paths[-1])
+    return paths
+
+
+def read_batch_log(directory):
+    """Every batch of a write_batch_log() directory as one frame."""
+    names = sorted(
+        name for name in os.listdir(directory)
+        if name.startswith("part-") and name.endswith((".arrow", ".npy"))
+    )
+    frames = []
+    for name in names:
+        path = os.path.join(directory, name)
+        if name.endswith(".arrow"):
+            with pa.memory_map(path) as source:
+                frames.append(
+                    pa.ipc.open_file(source).read_pandas(date_as_object=False)
+                )
+        else:
+            frames.append(pd.DataFrame(np.load(path)))
+    if not frames:
+        return pd.DataFrame(columns=RECORD_FIELDS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def zipf_weights(movies, exponent=ZIPF_EXPONENT, rank_by="Votes"):
+    """
+    Zipf popularity of every movie: 1 / rank**exponent, ranking by
+    `rank_by` (most votes = rank 1) when the catalog has it, else by
+    catalog order.
+    """
+    if rank_by in movies.columns:
+        score = movies[rank_by].to_numpy(dtype=np.float64, na_value=0.0)
+        order = np.argsort(-score, kind="stable")
+    else:
+        order = np.arange(len(movies))
+    ranks = np.empty(len(movies), dtype=np.float64)
+    ranks[order] = np.arange(1, len(movies) + 1)
+    return ranks ** -exponent
+
+
+def zipf_interactions(movies, users, seed=None, exponent=ZIPF_EXPONENT,
+                      sessions=SESSIONS_PER_USER,
+                      session_length=SESSION_LENGTH,
+                      gap_days=SESSION_GAP_DAYS, dates=DATE_RANGE,
+                      columns=("MovieName", "Genre")):
+    """
+    Interactions with a production-like load profile.
+
+    Compared with the uniform generators:
+
+        movies       Zipf popularity (zipf_weights), O(1) alias draws,
+                     so a few hot movies take most of the views
+        sessions     1 + Poisson(sessions - 1) per user; a session is
+                     1 + Poisson(session_length - 1) movies watched on
+                     the same day, and the days between a user's
+                     sessions are heavy-tailed (Lomax(GAP_SHAPE), scale
+                     gap_days):
+                     bursts of binge days, then long pauses; the first
+                     session falls anywhere in `dates` and sessions
+                     that would fall after its end are not watched
+        WatchTime    the movie's Watchtime times a completion fraction
+                     ~ Beta(COMPLETION), uniform WATCH_TIME when the
+                     catalog has no runtime
+        UserRating   round(BaseRating / 2 + Normal(0, 0.5)) in 1-5
+
+    Rows are grouped by user in watch order.
+    """
+    rng = np.random.default_rng(seed)
+    user_ids = pd.array(np.asarray(users), dtype=TEXT_DTYPE)
+    num_days = len(pd.date_range(*dates))
+
+    # Sessions: owner, day (start + cumulative bursty gaps) and length
+    per_user = 1 + rng.poisson(sessions - 1, len(user_ids))
+    session_user = np.repeat(np.arange(len(user_ids)), per_user)
+    gaps = rng.pareto(GAP_SHAPE, len(session_user)) * gap_days
+    first = np.concatenate([[0], np.cumsum(per_user)[:-1]])
+    gaps[first] = rng.uniform(0, num_days, len(user_ids))
+    elapsed = np.cumsum(gaps)
+    elapsed -= np.repeat(elapsed[first] - gaps[first], per_user)
+    session_day = elapsed.astype(np.int64)
+
+    # Sessions past the end of the range are dropped (length 0) rather
+    # than wrapped to its start, which would break the gaps
+    lengths = 1 + rng.poisson(session_length - 1, len(session_user))
+    lengths[session_day >= num_days] = 0
+    user_index = np.repeat(session_user, lengths)
+    days = np.repeat(session_day, lengths)
+
+    popularity = AliasSampler.from_weights(
+        np.arange(len(movies)), zipf_weights(movies, exponent)
+    )
+    rows = popularity.draw(rng, len(user_index))
+
+    if "Watchtime" in movies.columns:
+        runtime = movies["Watchtime"].to_numpy(
+            dtype=np.float64, na_value=np.nan
+        )[rows]
+    else:
+        runtime = np.full(len(rows), np.nan)
+    watched = np.round(runtime * rng.beta(*COMPLETION, len(rows)))
+    fallback = rng.integers(*WATCH_TIME, len(rows))
+    minutes = np.where(np.isnan(watched), fallback, np.maximum(watched, 1))
+
+    base = movies["BaseRating"].to_numpy(dtype=np.float64)[rows]
+    ratings = np.round(base / 2 + rng.normal(0, 0.5, len(rows)))
+    ratings = ratings.clip(*RATING_RANGE).astype(np.int8)
+
+    order = np.lexsort((days, user_index))
+    return _interaction_frame(
+        movies, user_ids, user_index[order], rows[order], ratings[order],
+        minutes[order].astype(np.int16), days[order], dates, columns
+    )
+
+
+def population_table(movies, num_users, version, key=None,
+                     profile="genre", seed=None):
+    """
+    Interactions of a simulated population of `num_users` users, cached
+    per (version, key, num_users, profile, seed) so reruns with the
+    same settings reuse the table instead of simulating it again.
+
+    profile "genre" -> population_interactions (genre preferences)
+            "zipf"  -> zipf_interactions (popularity skew, sessions)
+
+    The cached frame is shared; callers get a shallow copy they can add
+    columns to.
+    """
+    cache_key = (version, key, num_users, profile, seed)
+    with _parts_lock:
+        cached = _populations.get(cache_key)
+    if cached is None:
+        genres, _ = genre_matrix(movies)
+        population = make_population(num_users, genres, seed=seed)
+        if profile == "zipf":
+            cached = zipf_interactions(movies, population.user_ids, seed=seed)
+        else:
+            cached = population_interactions(movies, population, seed=seed)
+        with _parts_lock:
+            _remember(_populations, cache_key, cached, MAX_POPULATIONS)
+    return cached.copy(deep=False)
+
+
+def load_profile_stats(interactions, cache_shares=(0.01, 0.05, 0.1)):
+    """
+    Skew of an interaction table's movie accesses: the hit rate an
+    ideal cache holding the hottest `share` of the movies would get,
+    for each share.
+    """
+    views = interactions["MovieID"].value_counts().to_numpy()
+    hits = np.cumsum(views) / views.sum()
+    return {
+        share: float(hits[max(1, int(len(views) * share)) - 1])
+        for share in cache_shares
+    }
+
+
+def _loop_interactions(movies, users, per_user, sigma):
+    """The former iterrows() generator, kept for the benchmark."""
+    records = []
+    dates = pd.date_range(*DATE_RANGE)
+    for user in users:
+        sample_movies = movies.sample(per_user, replace=False)
+        for _, row in sample_movies.iterrows():
+            records.append([
+                user,
+                row["MovieID"],
+                row["MovieName"],
+                row["Genre"],
+                round(np.random.normal(row["BaseRating"], sigma), 1),
+                np.random.randint(*WATCH_TIME),
+                np.random.choice(dates)
+            ])
+    return pd.DataFrame(records, columns=INTERACTION_COLUMNS)
+
+
+def benchmark(interactions, num_movies=500, per_user=60):
+    """
+    Seconds per interaction of the loop (timed on a small sample and
+    extrapolated) and of generate_interactions() at full size.
+    """
+    rng = np.random.default_rng(0)
+    movies = pd.DataFrame({
+        "MovieID": np.arange(num_movies),
+        "MovieName": [f"Movie {i}" for i in range(num_movies)],
+        "Genre": rng.choice(["Drama", "Action, Crime", "Comedy"], num_movies),
+        "BaseRating": rng.uniform(5, 9, num_movies).round(1)
+    })
+    pool = [np.arange(num_movies)]
+
+    sample_users = [f"U{i}" for i in range(50)]
+    start = time.perf_counter()
+    _loop_interactions(movies, sample_users, per_user, 0.5)
+    loop_rate = (time.perf_counter() - start) / (len(sample_users) * per_user)
+
+    users = np.char.add("U", np.arange(interactions // per_user).astype(str))
+    start = time.perf_counter()
+    df = generate_interactions(movies, users, pool, per_user=per_user,
+                               sigma=0.5, seed=0)
+    vector_time = time.perf_counter() - start
+    return len(df), loop_rate * len(df), vector_time
+
+
+def write_population_log(directory, num_users, path="asta.csv", seed=0):
+    """Simulate `num_users` users over a catalog straight to a batch log."""
+    movies = load_movies(path)
+    genres, _ = genre_matrix(movies)
+    population = make_population(num_users, genres, seed=seed)
+    return write_batch_log(
+        iter_record_batches(movies, population, seed=seed), directory
+    )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "profile":
+        catalog = load_movies("asta.csv")
+        users = np.arange(int(sys.argv[2])).astype(str)
+        uniform = generate_interactions(
+            catalog, users, [np.arange(len(catalog))], per_user=12, seed=0
+        )
+        zipf = zipf_interactions(catalog, users, seed=0)
+        for name, table in [("uniform", uniform), ("zipf", zipf)]:
+            hits = load_profile_stats(table)
+            print(f"{name:8} {len(table):>10,} views  cache hit rate " +
+                  "  ".join(f"top {s:.0%}: {h:.0%}" for s, h in hits.items()))
+        sys.exit()
+
+    if len(sys.argv) > 1 and sys.argv[1] == "population":
+        # Large populations (the app stops at 10,000 users), e.g.
+        # python simulate.py population 1000000 zipf
+        catalog = load_movies("asta.csv")
+        profile = sys.argv[3] if len(sys.argv) > 3 else "genre"
+        start = time.perf_counter()
+        table = population_table(
+            catalog, int(sys.argv[2]), version=None, profile=profile, seed=0
+        )
+        print(f"{len(table):,} interactions ({profile}) in "
+              f"{time.perf_counter() - start:.1f}s")
+        sys.exit()
+
+    if len(sys.argv) > 1 and sys.argv[1] == "log":
+        parts = write_population_log(sys.argv[2], int(sys.argv[3]))
+        print(f"{len(parts)} parts -> {sys.argv[2]}")
+        sys.exit()
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000_000
+    rows, loop_time, vector_time = benchmark(n)
+    print(f"{rows:,} interactions")
+    print(f"iterrows loop  : {loop_time:.0f}s (extrapolated)")
+    print(f"vectorized     : {vector_time:.2f}s "
+          f"({loop_time / vector_time:.0f}x faster)")
@@ -0,0 +1,102 @@
+"""
+Ingest-time encoding detection and text repair for catalog columns.
+
+The scraped catalogs are cp1252 text, and asta1.csv ends every title
+with a non-breaking space byte (0xA0) plus padding, which shows up as
+"Towering Inferno\ufffd            " in UTF-8 terminals. Titles with such
+bytes never compare equal to clean input, so groupbys on MovieName and
+exact lookups silently miss.
+
+detect_encoding() picks the file encoding once per file version and
+repair_text() normalizes a whole text column in bulk (mojibake undo,
+replacement-character removal, whitespace collapse). Both run while a
+catalog is parsed, and the repaired frame is what the snapshot and the
+in-process cache hold, so reruns never repeat the fix-ups.
+"""
+
+import codecs
+import re
+
+import pandas as pd
+
+from converters import TEXT_DTYPE
+
+
+# Tried in order; latin1 decodes any byte sequence, so it always wins last
+CANDIDATE_ENCODINGS = ["utf-8", "cp1252", "latin1"]
+
+# UTF-8 bytes that were decoded as cp1252/latin1 ("CafÃ©" for "Café"):
+# a lead byte (Â-ß, à-ï, ð-ô) followed by 1, 2 or 3 continuation
+# bytes, which cp1252 shows as non-ASCII characters outside À-ÿ
+_CONTINUATION = "[^\x00-\x7f\u00c0-\u00ff]"
+MOJIBAKE_PATTERN = (
+    f"[\u00c2-\u00df]{_CONTINUATION}"
+    f"|[\u00e0-\u00ef]{_CONTINUATION}{{2}}"
+    f"|[\u00f0-\u00f4]{_CONTINUATION}{{3}}"
+)
+_mojibake_run = re.compile(MOJIBAKE_PATTERN)
+
+# Any run of whitespace, including non-breaking and zero-width spaces
+WHITESPACE_PATTERN = "[\\s\u00a0\u2000-\u200b\u3000]+"
+
+# Character decoders substitute for bytes they cannot map
+REPLACEMENT_CHARACTER = "\ufffd"
+
+
+def detect_encoding(path, chunk_size=1 << 20):
+    """First candidate encoding that decodes the whole file."""
+    with open(path, "rb") as f:
+        if f.read(3) == codecs.BOM_UTF8:
+            return "utf-8-sig"
+
+    for encoding in CANDIDATE_ENCODINGS:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(chunk_size), b""):
+                    decoder.decode(block)
+                decoder.decode(b"", final=True)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return CANDIDATE_ENCODINGS[-1]
+
+
+def _redecode(match):
+    """Re-decode one double-encoded run, leaving it alone if that fails."""
+    run = match.group()
+    try:
+        return run.encode("cp1252").decode("utf-8")
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        return run
+
+
+def _undo_mojibake(text):
+    """Re-decode every double-encoded run inside one value."""
+    return _mojibake_run.sub(_redecode, text)
+
+
+def repair_text(values):
+    """
+    Clean a text column in bulk.
+
+    Mojibake is undone only on the rows that show its byte pattern.
+    U+FFFD replacement characters are dropped, and every whitespace run
+    (including NBSP padding) becomes a single space before the ends are
+    trimmed. The column keeps its original dtype.
+    """
+    text = values.astype(TEXT_DTYPE)
+
+    damaged = text.str.contains(MOJIBAKE_PATTERN, regex=True)
+    damaged = damaged.fillna(False).astype(bool)
+    if damaged.any():
+        text = text.where(~damaged, text[damaged].map(_undo_mojibake))
+
+    text = (
+        text.str.replace(REPLACEMENT_CHARACTER, "", regex=False)
+        .str.replace(WHITESPACE_PATTERN, " ", regex=True)
+        .str.strip()
+    )
+    return pd.Series(text, index=values.index, name=values.name).astype(
+        values.dtype
+    )
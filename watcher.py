@@ -0,0 +1,99 @@
+"""
+Background hot reload of a catalog file.
+
+watch(path) starts (once per process and path) a daemon thread that
+polls the file. When its contents change, the thread builds the new
+cleaned catalog, its quarantine table and every structure registered
+with catalog.register_derived() (such as the genre index) off the
+request path, then swaps them into catalog.py's cache together in a
+single assignment.
+
+Until that swap, every rerun keeps getting the previous catalog from
+the cache without touching the file, and a rerun that already holds
+the old frame finishes on it. Replacing asta.csv in production
+therefore needs no restart and no session pays for the rebuild.
+"""
+
+import os
+import threading
+
+import catalog
+
+
+# Seconds between two checks of the watched file
+POLL_INTERVAL = 2.0
+
+# Running watchers, keyed by absolute path
+_watchers = {}
+_watchers_lock = threading.Lock()
+
+
+class CatalogWatcher(threading.Thread):
+    """Daemon thread that keeps one catalog file's cache entry fresh."""
+
+    def __init__(self, path, interval=POLL_INTERVAL):
+        super().__init__(
+            name=f"catalog-watcher:{os.path.basename(path)}", daemon=True
+        )
+        self.path = path
+        self.interval = interval
+        self.reloads = 0
+        self.last_error = None
+        self._stopped = threading.Event()
+        self._seen = None
+
+    def check(self):
+        """Reload the catalog if the file changed since the last check."""
+        stat = catalog.file_stat(self.path)
+        if stat == self._seen:
+            return False
+
+        # Derived structures are built inside refresh(), from the new
+        # frame, so they are ready when the new catalog becomes visible
+        changed = catalog.refresh(self.path)
+
+        self._seen = stat
+        self.reloads += changed
+        return changed
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.check()
+                self.last_error = None
+            except Exception as error:  # keep serving the old version
+                self.last_error = error
+
+    def stop(self):
+        """Stop polling and hand the path back to load_movies' own checks."""
+        self._stopped.set()
+        catalog.set_watched(self.path, False)
+
+
+def watch(path, interval=POLL_INTERVAL):
+    """
+    Start watching `path` unless a watcher already runs for it.
+
+    The first load happens here, on the caller's thread, so the cache
+    entry exists before load_movies() stops checking the file.
+    """
+    key = os.path.abspath(path)
+    with _watchers_lock:
+        watcher = _watchers.get(key)
+        if watcher is not None and watcher.is_alive():
+            return watcher
+
+        watcher = CatalogWatcher(path, interval)
+        watcher.check()
+        catalog.set_watched(path)
+        watcher.start()
+        _watchers[key] = watcher
+        return watcher
+
+
+def stop_all():
+    """Stop every running watcher."""
+    with _watchers_lock:
+        for watcher in _watchers.values():
+            watcher.stop()
+        _watchers.clear()